@@ -1,148 +1,219 @@
-from flask import Flask, render_template, request, jsonify, session
-import xml.etree.ElementTree as ET
-import random
-import re
-import unicodedata
+from flask import Flask, abort, g, render_template, request, jsonify, session
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+import hashlib
 import os
-import glob
+import pstats
+import secrets
+import time
+
+from dictionaries import (available_lessons, get_dictionary, normalize_text,
+                          refresh_lessons, start_lesson_watcher)
+from fuzzy import closest_answer
+import metrics
+from progress_store import DeckBackend, ProgressStore
+from scheduler import Scheduler
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-change-this'
 
-basedir = os.path.abspath(os.path.dirname(__file__))
-
-# Diccionarios para almacenar palabras y traducciones
-# NOTA: En Gunicorn, cada worker tendrá su propia copia de estos diccionarios.
-dictionary = {}
-available_lessons = {}
-
-def normalize_text(text):
-    """Normaliza el texto quitando acentos y convirtiendo a minúsculas."""
-    text = unicodedata.normalize('NFD', text)
-    text = ''.join(char for char in text if unicodedata.category(char) != 'Mn')
-    return text.lower().strip()
-
-def parse_translations(translations_text):
-    """Analiza un texto de traducciones y extrae todas las posibles traducciones."""
-    if not translations_text:
-        return []
-    translations = [t.strip() for t in re.split('[,;]', translations_text)]
-    normalized_translations = []
-    for translation in translations:
-        if not translation:
-            continue
-        cleaned = re.sub(r'\{[mfn]\}', '', translation).strip()
-        cleaned = re.sub(r'\[[^\]]+\]', '', cleaned).strip()
-        if '(' in cleaned and ')' in cleaned:
-            without_parentheses = re.sub(r'\s*\([^)]*\)', '', cleaned).strip()
-            if without_parentheses:
-                normalized_translations.append(normalize_text(without_parentheses))
-            normalized_translations.append(normalize_text(cleaned))
-        else:
-            normalized_translations.append(normalize_text(cleaned))
-        if cleaned.strip().lower().startswith('to '):
-            without_to = cleaned[3:].strip()
-            if without_to:
-                if '(' in without_to and ')' in without_to:
-                    without_parentheses = re.sub(r'\s*\([^)]*\)', '', without_to).strip()
-                    if without_parentheses:
-                        normalized_translations.append(normalize_text(without_parentheses))
-                normalized_translations.append(normalize_text(without_to))
-    seen = set()
-    result = []
-    for translation in normalized_translations:
-        if translation and translation not in seen:
-            seen.add(translation)
-            result.append(translation)
-    return result
-
-def discover_lessons():
-    """Descubre todos los archivos de lecciones XML."""
-    global available_lessons
-    available_lessons = {}
-    filename = 'dict_es_en.xml'
-    available_lessons[filename] = {
-        'name': 'Diccionario completo',
-        'file': os.path.join(basedir, filename),
-        'type': 'main'
-    }
-    lessons_dir = os.path.join(basedir, 'lessons')
-    if os.path.exists(lessons_dir):
-        lesson_files = glob.glob(os.path.join(lessons_dir, '*.xml'))
-        for lesson_file in lesson_files:
-            filename = os.path.basename(lesson_file)
-            lesson_name = os.path.splitext(filename)[0]
-            display_name = f"Lección {lesson_name}"
-            available_lessons[filename] = {
-                'name': display_name,
-                'file': lesson_file,
-                'type': 'lesson'
-            }
-    return available_lessons
-
-def load_dictionary(dict_key=None):
+# Respuestas "casi correctas" en /check (ver fuzzy.py); desactivado por defecto
+app.config['FUZZY_MATCHING'] = os.environ.get('FUZZY_MATCHING', '0') == '1'
+app.config['FUZZY_MAX_DISTANCE'] = int(os.environ.get('FUZZY_MAX_DISTANCE', '2'))
+app.config['FUZZY_BUDGET_MS'] = float(os.environ.get('FUZZY_BUDGET_MS', '1.0'))
+
+# Lotes de palabras que el cliente corrige localmente (ver /quiz/batch)
+app.config['QUIZ_BATCH_SIZE'] = int(os.environ.get('QUIZ_BATCH_SIZE', '20'))
+app.config['QUIZ_BATCH_MAX_SIZE'] = 100
+app.config['QUIZ_BATCH_MAX_AGE'] = 24 * 60 * 60
+
+# Base de datos SQLite con el estado y el progreso de los alumnos
+app.config['PROGRESS_DB'] = os.environ.get(
+    'PROGRESS_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'progress.db'))
+
+# Fracción de peticiones que se perfilan con cProfile (0 lo desactiva); ver /debug/profile
+app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+
+DEFAULT_LESSON_KEY = 'dict_es_en.xml'
+
+# --- Esta inicialización se ejecuta en cada worker de Gunicorn ---
+# Carga el diccionario principal y las lecciones como vistas sobre él, y
+# vigila la carpeta de lecciones para recargar las nuevas o modificadas
+refresh_lessons()
+start_lesson_watcher()
+
+# Estado y progreso de los alumnos; la cookie de sesión sólo lleva learner_id
+progress = ProgressStore(app.config['PROGRESS_DB'])
+
+# Repaso espaciado por alumno; los mazos se guardan junto al progreso
+scheduler = Scheduler(DeckBackend(progress))
+
+# Métricas de las peticiones (ver /metrics) y perfilado por muestreo
+request_latency = metrics.REGISTRY.histogram(
+    'http_request_duration_seconds', 'Latencia de las peticiones por ruta y método',
+    ('route', 'method'))
+request_count = metrics.REGISTRY.counter(
+    'http_requests_total', 'Peticiones por ruta, método y código de estado',
+    ('route', 'method', 'status'))
+profiler = metrics.SampledProfiler(app.config['PROFILE_SAMPLE_RATE'])
+
+# ---------------------------------------------------------------------
+
+def join_senses(senses, field):
+    """Une un campo de todas las acepciones (sin repetir) para mostrarlo."""
+    values = (getattr(sense, field) for sense in senses)
+    return '; '.join(dict.fromkeys(value for value in values if value))
+
+def senses_to_json(senses):
+    return [{'translations': sense.original_translations,
+             'definition': sense.definition} for sense in senses]
+
+def grade_answer(dictionary, word, user_translation):
+    """
+    Corrige una respuesta con las mismas reglas para /check y /check_batch.
+
+    Devuelve (estado, coincidencia): estado es 'correct', 'almost' o
+    'incorrect' y coincidencia es (respuesta, distancia) en el caso 'almost'.
+    """
+    normalized_input = normalize_text(user_translation)
+    answers = dictionary.answer_set(word)
+    if normalized_input in answers:
+        return 'correct', None
+    if app.config['FUZZY_MATCHING']:
+        match = closest_answer(answers, normalized_input,
+                               max_distance=app.config['FUZZY_MAX_DISTANCE'],
+                               budget_ms=app.config['FUZZY_BUDGET_MS'])
+        if match is not None:
+            return 'almost', match
+    return 'incorrect', None
+
+def learner_id():
+    """Identificador anónimo y persistente del alumno, guardado en la sesión."""
+    if 'learner_id' not in session:
+        session['learner_id'] = secrets.token_hex(8)
+    return session['learner_id']
+
+def learner_state():
+    """Estado del alumno (lesson_key, current_word, help_shown), leído una vez por petición."""
+    if 'learner_state' not in g:
+        g.learner_state = progress.get_state(learner_id())
+    return g.learner_state
+
+def update_learner_state(**changes):
+    """Modifica el estado del alumno y lo guarda en el servidor."""
+    state = learner_state()
+    state.update(changes)
+    progress.save_state(learner_id(), state)
+
+def learner_lesson():
+    """
+    (clave, diccionario) de la lección del alumno. Si aún no tiene o la suya
+    ya no existe (su XML se ha borrado), pasa al diccionario completo y lo guarda.
+    """
+    lesson_key = learner_state()['lesson_key']
+    if lesson_key in available_lessons:
+        dictionary = get_dictionary(lesson_key)
+        # get_dictionary puede haber recargado las lecciones y visto que ya no está
+        if lesson_key in available_lessons:
+            return lesson_key, dictionary
+    update_learner_state(lesson_key=DEFAULT_LESSON_KEY)
+    return DEFAULT_LESSON_KEY, get_dictionary(DEFAULT_LESSON_KEY)
+
+def pick_word(lesson_key, dictionary):
+    """Siguiente palabra que debe practicar el alumno, según el planificador."""
+    return scheduler.next_word(learner_id(), lesson_key, dictionary)
+
+def record_attempt(lesson_key, word, correct, help_used=False):
+    """Registra el resultado de un intento en el progreso del alumno y en el planificador."""
+    progress.record_attempt(learner_id(), lesson_key, word, correct, help_used)
+    scheduler.review(learner_id(), lesson_key, word, correct, help_used)
+
+def _quiz_serializer():
+    return URLSafeTimedSerializer(app.secret_key, salt='quiz-batch')
+
+def hash_answer(salt, normalized_answer):
+    """Hash con sal de una respuesta normalizada, tal y como lo calcula el cliente."""
+    return hashlib.sha256(f'{salt}:{normalized_answer}'.encode('utf-8')).hexdigest()
+
+def json_object():
     """
-    Carga el diccionario XML en memoria para este worker.
+    Cuerpo JSON de la petición como dict: vacío si no hay cuerpo o no es
+    JSON válido, y None si es JSON pero no un objeto (una lista, un número...).
     """
-    global dictionary
-    if dict_key is None:
-        dict_key = 'dict_es_en.xml'
-    if dict_key not in available_lessons:
-        dictionary = {}
-        return
-    file_to_load = available_lessons[dict_key]['file']
-    dictionary = {}
+    data = request.get_json(silent=True)
+    if data is None:
+        return {}
+    return data if isinstance(data, dict) else None
+
+def batch_size(value):
+    """Tamaño de lote pedido por el cliente; el de por defecto si no es un entero."""
     try:
-        tree = ET.parse(file_to_load)
-        root = tree.getroot()
-        for word_elem in root.findall('.//w'):
-            spanish_word_elem = word_elem.find('c')
-            english_translations_elem = word_elem.find('d')
-            definition_elem = word_elem.find('t')
-            if spanish_word_elem is None or spanish_word_elem.text is None:
-                continue
-            spanish_word = spanish_word_elem.text.strip()
-            english_translations = english_translations_elem.text if english_translations_elem is not None else ""
-            definition = definition_elem.text if definition_elem is not None else ""
-            possible_translations = parse_translations(english_translations)
-            if possible_translations:
-                dictionary[spanish_word] = {
-                    'translations': possible_translations,
-                    'original_translations': english_translations,
-                    'definition': definition
-                }
-    except Exception as e:
-        dictionary = {
-            "casa": {
-                "translations": ["house", "home"],
-                "original_translations": "house, home",
-                "definition": "{f} /ˈkasa/ (building for living)"
-            }
-        }
+        return int(value)
+    except (TypeError, ValueError, OverflowError):
+        # OverflowError: JSON admite 1e400, que Python lee como infinito
+        return app.config['QUIZ_BATCH_SIZE']
 
-# --- Esta inicialización se ejecuta en cada worker de Gunicorn ---
-discover_lessons()
-load_dictionary()
+def make_quiz_batch(lesson_key, dictionary, size):
+    """
+    Prepara un lote de palabras para corregir en el cliente.
 
-# ---------------------------------------------------------------------
+    Las respuestas viajan como hashes con sal de sus variantes normalizadas,
+    y la lista de palabras emitidas va firmada en el token para que
+    /check_batch sólo acepte resultados de palabras de este lote.
+    """
+    size = max(1, min(size, app.config['QUIZ_BATCH_MAX_SIZE'], len(dictionary)))
+    words = scheduler.next_words(learner_id(), lesson_key, dictionary, size)
+    salt = secrets.token_hex(8)
+    items = []
+    for word in words:
+        senses = dictionary[word]
+        items.append({
+            'word': word,
+            'answers': sorted(hash_answer(salt, answer) for answer in dictionary.answer_set(word)),
+            'definition': join_senses(senses, 'definition')
+        })
+    token = _quiz_serializer().dumps({'lesson': lesson_key, 'words': words})
+    # Con respuestas casi correctas, el cliente envía los fallos en seguida
+    # para mostrar el veredicto de /check_batch
+    return {'token': token, 'salt': salt, 'words': items,
+            'fuzzy': app.config['FUZZY_MATCHING']}
+
+@app.before_request
+def start_request_metrics():
+    # Se resuelve el proxy de g una sola vez: cada acceso cuesta más que la propia medida
+    ctx = g._get_current_object()
+    ctx.request_started = time.perf_counter()
+    ctx.profile = profiler.start()
+
+@app.after_request
+def record_request_metrics(response):
+    ctx = g._get_current_object()
+    started = ctx.get('request_started')
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    req = request._get_current_object()
+    # Se etiqueta con la regla de la ruta, no con la URL, para acotar las series
+    route = req.url_rule.rule if req.url_rule is not None else 'unmatched'
+    profile = ctx.pop('profile', None)
+    if profile is not None:
+        profiler.stop(profile, route)
+    else:
+        # Las peticiones perfiladas son más lentas y no cuentan en la latencia
+        request_latency.labels(route, req.method).observe(elapsed)
+    request_count.labels(route, req.method, response.status_code).inc()
+    return response
 
 @app.route('/')
 def index():
-    # Establece la clave de la lección en la sesión si no existe
-    if 'current_lesson_key' not in session:
-        session['current_lesson_key'] = 'dict_es_en.xml'
-    
-    current_lesson_key = session.get('current_lesson_key')
-
-    # Carga el diccionario correspondiente a la sesión del usuario
-    load_dictionary(current_lesson_key)
+    # Usa la lección del alumno o, si no tiene o ya no existe, el diccionario completo
+    current_lesson_key, dictionary = learner_lesson()
 
     if not dictionary:
         return "Error: Dictionary not loaded"
     
-    spanish_word = random.choice(list(dictionary.keys()))
-    session['current_word'] = spanish_word
-    session['help_shown'] = False
+    spanish_word = pick_word(current_lesson_key, dictionary)
+    update_learner_state(lesson_key=current_lesson_key, current_word=spanish_word,
+                         help_shown=False)
     
     current_lesson_info = available_lessons.get(current_lesson_key)
     
@@ -154,12 +225,10 @@ def index():
 
 @app.route('/check', methods=['POST'])
 def check_translation():
-    # Recargar el diccionario para este worker antes de usarlo
-    current_lesson_key = session.get('current_lesson_key')
-    load_dictionary(current_lesson_key)
+    current_lesson_key, dictionary = learner_lesson()
 
     user_translation = request.form.get('translation', '').strip()
-    current_word = session.get('current_word')
+    current_word = learner_state()['current_word']
     
     if not current_word or current_word not in dictionary:
         return jsonify({
@@ -167,22 +236,29 @@ def check_translation():
             'message': 'No word selected'
         })
     
-    normalized_input = normalize_text(user_translation)
-    possible_translations = dictionary[current_word]['translations']
-    is_correct = any(normalized_input == normalized_translation for normalized_translation in possible_translations)
+    status, match = grade_answer(dictionary, current_word, user_translation)
+    record_attempt(current_lesson_key, current_word, status == 'correct',
+                   learner_state()['help_shown'])
     
-    if is_correct:
-        new_spanish_word = random.choice(list(dictionary.keys()))
-        session['current_word'] = new_spanish_word
-        session['help_shown'] = False
+    if status == 'correct':
+        new_spanish_word = pick_word(current_lesson_key, dictionary)
+        update_learner_state(current_word=new_spanish_word, help_shown=False)
         return jsonify({
             'status': 'correct',
             'message': '¡Correcto!',
             'user_answer': user_translation,
             'new_word': new_spanish_word
         })
+    elif status == 'almost':
+        return jsonify({
+            'status': 'almost',
+            'message': 'Casi correcto',
+            'user_answer': user_translation,
+            'closest': match[0],
+            'distance': match[1]
+        })
     else:
-        correct_translations = dictionary[current_word]['original_translations']
+        correct_translations = join_senses(dictionary[current_word], 'original_translations')
         return jsonify({
             'status': 'incorrect',
             'message': 'Incorrecto',
@@ -190,33 +266,120 @@ def check_translation():
             'correct_translations': correct_translations
         })
 
+@app.route('/quiz/batch', methods=['POST'])
+def quiz_batch():
+    data = json_object()
+    if data is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Petición no válida'
+        }), 400
+    current_lesson_key, dictionary = learner_lesson()
+
+    if not dictionary:
+        return jsonify({
+            'status': 'error',
+            'message': 'Dictionary not loaded'
+        })
+
+    size = batch_size(data.get('size', app.config['QUIZ_BATCH_SIZE']))
+    return jsonify({'status': 'success', **make_quiz_batch(current_lesson_key, dictionary, size)})
+
+@app.route('/check_batch', methods=['POST'])
+def check_batch():
+    """
+    Recibe los resultados de un lote corregido en el cliente.
+
+    Cada respuesta se vuelve a corregir en el servidor con grade_answer (lo
+    que diga el cliente no cuenta) y se registra. Si se pide 'next', la
+    respuesta incluye además el siguiente lote para ahorrar otra petición.
+    """
+    data = json_object()
+    if data is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Petición no válida'
+        }), 400
+    token = data.get('token')
+    try:
+        if not isinstance(token, str):
+            raise BadSignature('Falta el token')
+        batch = _quiz_serializer().loads(token, max_age=app.config['QUIZ_BATCH_MAX_AGE'])
+    except BadSignature:
+        return jsonify({
+            'status': 'error',
+            'message': 'Lote no válido o caducado'
+        })
+
+    results = data.get('results') or []
+    # Se admiten varios intentos por palabra, pero no un número arbitrario
+    if not isinstance(results, list) or len(results) > 5 * len(batch['words']):
+        return jsonify({
+            'status': 'error',
+            'message': 'Resultados no válidos'
+        })
+
+    lesson_key = batch['lesson']
+    dictionary = get_dictionary(lesson_key)
+    issued = set(batch['words'])
+    verdicts = []
+    correct_count = 0
+    for result in results:
+        word = result.get('word') if isinstance(result, dict) else None
+        if not isinstance(word, str) or word not in issued or word not in dictionary:
+            verdicts.append({'word': word if isinstance(word, str) else None, 'status': 'error'})
+            continue
+        status, match = grade_answer(dictionary, word, str(result.get('answer', '')).strip())
+        record_attempt(lesson_key, word, status == 'correct', bool(result.get('help')))
+        correct_count += status == 'correct'
+        verdict = {'word': word, 'status': status}
+        if match is not None:
+            verdict['closest'] = match[0]
+        verdicts.append(verdict)
+
+    response = {
+        'status': 'success',
+        'results': verdicts,
+        'correct': correct_count,
+        'recorded': sum(v['status'] != 'error' for v in verdicts)
+    }
+    next_size = data.get('next')
+    if next_size:
+        next_size = batch_size(next_size)
+        current_lesson_key, current_dictionary = learner_lesson()
+        if current_dictionary:
+            response['next_batch'] = make_quiz_batch(current_lesson_key, current_dictionary, next_size)
+    return jsonify(response)
+
 @app.route('/get_answer', methods=['POST'])
 def get_answer():
     try:
-        current_lesson_key = session.get('current_lesson_key')
-        load_dictionary(current_lesson_key)
+        current_lesson_key, dictionary = learner_lesson()
         data = request.get_json()
         word = data.get('word', '').strip()
         if not word or not dictionary:
             return jsonify({'success': False, 'error': 'Invalid word or dictionary not loaded'})
         if word in dictionary:
-            translation = dictionary[word]['original_translations']
+            senses = dictionary[word]
+            translation = join_senses(senses, 'original_translations')
             if translation:
-                return jsonify({'success': True, 'translation': translation})
-        for entry_word in dictionary:
-            if entry_word.lower() == word.lower():
-                translation = dictionary[entry_word]['original_translations']
+                return jsonify({'success': True, 'translation': translation,
+                                'senses': senses_to_json(senses)})
+        # Sin coincidencia exacta: busca ignorando acentos y mayúsculas
+        for entry_word in dictionary.lookup_normalized(word):
+            if entry_word != word:
+                senses = dictionary[entry_word]
+                translation = join_senses(senses, 'original_translations')
                 if translation:
-                    return jsonify({'success': True, 'translation': translation})
+                    return jsonify({'success': True, 'translation': translation,
+                                    'senses': senses_to_json(senses)})
         return jsonify({'success': False, 'error': 'Word not found in dictionary'})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/new_word', methods=['POST'])
 def new_word():
-    # Recargar el diccionario para este worker antes de usarlo
-    current_lesson_key = session.get('current_lesson_key')
-    load_dictionary(current_lesson_key)
+    current_lesson_key, dictionary = learner_lesson()
 
     if not dictionary:
         return jsonify({
@@ -224,9 +387,8 @@ def new_word():
             'message': 'Dictionary not loaded'
         })
     
-    new_spanish_word = random.choice(list(dictionary.keys()))
-    session['current_word'] = new_spanish_word
-    session['help_shown'] = False
+    new_spanish_word = pick_word(current_lesson_key, dictionary)
+    update_learner_state(current_word=new_spanish_word, help_shown=False)
     
     return jsonify({
         'status': 'success',
@@ -245,11 +407,8 @@ def switch_lesson():
                 'message': 'Lección no válida'
             })
         
-        # Actualiza la sesión para que las futuras solicitudes usen la lección correcta
-        session['current_lesson_key'] = lesson_key
-        
-        # Carga el nuevo diccionario en este worker para la primera palabra
-        load_dictionary(lesson_key)
+        # Obtiene el nuevo diccionario para elegir la primera palabra
+        dictionary = get_dictionary(lesson_key)
 
         if not dictionary:
             return jsonify({
@@ -257,9 +416,10 @@ def switch_lesson():
                 'message': 'Error al cargar la lección'
             })
         
-        new_spanish_word = random.choice(list(dictionary.keys()))
-        session['current_word'] = new_spanish_word
-        session['help_shown'] = False
+        new_spanish_word = pick_word(lesson_key, dictionary)
+        # Guarda la lección para que las futuras solicitudes usen la correcta
+        update_learner_state(lesson_key=lesson_key, current_word=new_spanish_word,
+                             help_shown=False)
         
         return jsonify({
             'status': 'success',
@@ -276,11 +436,9 @@ def switch_lesson():
 
 @app.route('/help', methods=['POST'])
 def get_help():
-    # Recargar el diccionario para este worker antes de usarlo
-    current_lesson_key = session.get('current_lesson_key')
-    load_dictionary(current_lesson_key)
+    current_lesson_key, dictionary = learner_lesson()
     
-    current_word = session.get('current_word')
+    current_word = learner_state()['current_word']
     
     if not current_word or current_word not in dictionary:
         return jsonify({
@@ -288,15 +446,46 @@ def get_help():
             'message': 'No word selected'
         })
     
-    word_data = dictionary[current_word]
-    session['help_shown'] = True
+    senses = dictionary[current_word]
+    update_learner_state(help_shown=True)
+    progress.record_help(learner_id(), current_lesson_key, current_word)
     
     return jsonify({
         'status': 'success',
         'word': current_word,
-        'definition': word_data['definition'],
-        'translations': word_data['original_translations']
+        'definition': join_senses(senses, 'definition'),
+        'translations': join_senses(senses, 'original_translations'),
+        'senses': senses_to_json(senses)
+    })
+
+@app.route('/stats')
+def stats():
+    """Precisión del alumno en cada lección que ha practicado."""
+    lessons = progress.lesson_stats(learner_id())
+    for lesson in lessons:
+        lesson_info = available_lessons.get(lesson['lesson_key'])
+        lesson['lesson_name'] = lesson_info['name'] if lesson_info else lesson['lesson_key']
+    return jsonify({
+        'status': 'success',
+        'lessons': lessons
     })
 
+@app.route('/metrics')
+def metrics_endpoint():
+    """Métricas del worker en formato de texto de Prometheus."""
+    return app.response_class(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/debug/profile')
+def profile_report():
+    """Perfiles acumulados de las peticiones muestreadas (sólo con PROFILE_SAMPLE_RATE > 0)."""
+    if not app.config['PROFILE_SAMPLE_RATE']:
+        abort(404)
+    sort = request.args.get('sort', 'cumulative')
+    if sort not in pstats.Stats.sort_arg_dict_default:
+        abort(400)
+    limit = request.args.get('limit', 40, type=int)
+    report = profiler.report(request.args.get('route'), sort=sort, limit=limit)
+    return app.response_class(report, content_type='text/plain; charset=utf-8')
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0')
\ No newline at end of file
@@ -0,0 +1,69 @@
+"""
+Ejecuta todos los benchmarks y guarda los resultados en JSON.
+
+    python -m benchmarks --output resultados.json
+    python -m benchmarks --quick --output nuevo.json --compare base.json
+
+Con --compare se muestran las métricas que cambian respecto a otro
+resultado y se marcan las que empeoran más de --threshold; con --strict
+el proceso termina con código 1 si alguna empeora. Los tiempos varían de
+una ejecución a otra, así que conviene comparar resultados obtenidos en la
+misma máquina.
+"""
+import argparse
+import sys
+
+from benchmarks import bench_fuzzy, bench_load, bench_micro
+from benchmarks.common import compare, metadata, print_comparison, read_json, write_json
+
+SUITES = ('micro', 'fuzzy', 'load')
+
+
+def run(suites=SUITES, quick=False, seed=0):
+    results = {'meta': metadata()}
+    results['meta']['quick'] = quick
+    if 'micro' in suites:
+        print("== microbenchmarks", file=sys.stderr)
+        results['micro'] = bench_micro.run(repeat=1 if quick else 3)
+    if 'fuzzy' in suites:
+        print("== fuzzy", file=sys.stderr)
+        results['fuzzy'] = bench_fuzzy.run(samples=2000 if quick else 20000, seed=seed)
+    if 'load' in suites:
+        print("== carga", file=sys.stderr)
+        if quick:
+            results['load'] = bench_load.run(learners=8, rounds=10, seed=seed, cold_start_repeat=1)
+        else:
+            results['load'] = bench_load.run(seed=seed)
+        bench_load.print_report(results['load'])
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--only', action='append', choices=SUITES,
+                        help="Ejecuta sólo esta parte (se puede repetir).")
+    parser.add_argument('--quick', action='store_true',
+                        help="Menos repeticiones y alumnos, para comprobaciones rápidas.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Archivo JSON donde guardar los resultados.")
+    parser.add_argument('--compare', help="Resultado JSON anterior con el que comparar.")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="Cambio relativo a partir del cual una métrica empeora (0.10).")
+    parser.add_argument('--strict', action='store_true',
+                        help="Termina con código 1 si alguna métrica empeora.")
+    args = parser.parse_args(argv)
+
+    results = run(tuple(args.only or SUITES), args.quick, args.seed)
+    if args.output:
+        write_json(args.output, results)
+        print(f"Resultados guardados en {args.output}")
+    if args.compare:
+        baseline = read_json(args.compare)
+        print(f"Comparación con {args.compare} (commit {baseline['meta'].get('commit')}):")
+        rows = compare(baseline, results, args.threshold)
+        print_comparison(rows)
+        if args.strict and any(worse for *_, worse in rows):
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
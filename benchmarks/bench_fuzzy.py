@@ -0,0 +1,77 @@
+"""
+Latencia de closest_answer sobre el diccionario completo.
+
+Toma palabras al azar, introduce una errata en una de sus respuestas y mide
+cuánto tarda la búsqueda (con el trie ya en caché y sin él).
+
+    python -m benchmarks.bench_fuzzy [--samples N] [--max-distance K]
+"""
+import argparse
+import random
+import string
+import time
+
+import dictionaries
+import fuzzy
+from benchmarks.common import percentile
+
+
+def add_typo(text, rng):
+    """Aplica una errata al azar: borrado, inserción, sustitución o intercambio."""
+    i = rng.randrange(len(text))
+    kind = rng.choice(('delete', 'insert', 'replace', 'swap'))
+    if kind == 'delete' and len(text) > 1:
+        return text[:i] + text[i + 1:]
+    if kind == 'insert':
+        return text[:i] + rng.choice(string.ascii_lowercase) + text[i:]
+    if kind == 'swap' and i + 1 < len(text):
+        return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+    return text[:i] + rng.choice(string.ascii_lowercase) + text[i + 1:]
+
+def run(samples=20000, max_distance=2, seed=0, dict_key='dict_es_en.xml'):
+    dictionaries.discover_lessons()
+    store = dictionaries.get_dictionary(dict_key)
+    rng = random.Random(seed)
+    cases = []
+    for _ in range(samples):
+        word = rng.choice(store.words)
+        answers = store.answer_set(word)
+        cases.append((answers, add_typo(rng.choice(sorted(answers)), rng)))
+
+    results = {}
+    for label in ('cold', 'warm'):
+        fuzzy.answer_trie.cache_clear()
+        if label == 'warm':
+            for answers, _ in cases:
+                fuzzy.answer_trie(answers)
+        timings = []
+        hits = 0
+        for answers, typo in cases:
+            started = time.perf_counter()
+            match = fuzzy.closest_answer(answers, typo, max_distance=max_distance, budget_ms=None)
+            timings.append((time.perf_counter() - started) * 1e6)
+            hits += match is not None
+        timings.sort()
+        results[label] = {
+            'p50_us': percentile(timings, 0.50),
+            'p95_us': percentile(timings, 0.95),
+            'p99_us': percentile(timings, 0.99),
+            'max_us': timings[-1],
+            'matched': hits / len(cases),
+        }
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--samples', type=int, default=20000)
+    parser.add_argument('--max-distance', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    results = run(args.samples, args.max_distance, args.seed)
+    for label, stats in results.items():
+        print(f"{label:>5}: p50 {stats['p50_us']:.1f} µs  p95 {stats['p95_us']:.1f} µs  "
+              f"p99 {stats['p99_us']:.1f} µs  max {stats['max_us']:.1f} µs  "
+              f"coincidencias {stats['matched']:.1%}")
+
+if __name__ == '__main__':
+    main()
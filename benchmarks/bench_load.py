@@ -0,0 +1,309 @@
+"""
+Prueba de carga de las rutas de práctica, sin red externa.
+
+Simula alumnos que repiten la secuencia nueva palabra -> respuesta
+incorrecta -> ayuda -> respuesta correcta y cambian de lección cada pocas
+rondas, entre dict_es_en.xml y lessons/*.xml. La simulación se ejecuta con
+el cliente de pruebas de Flask (sin HTTP) y contra un servidor WSGI en un
+hilo del mismo proceso (HTTP por loopback, varios clientes a la vez), y
+mide throughput y p50/p95/p99 por ruta.
+
+También mide el arranque en frío de un worker (importar app y atender la
+primera petición) en un proceso aparte, con y sin binarios precompilados,
+y su memoria residente antes y después de atender alumnos.
+
+El progreso de los alumnos se guarda en una base de datos temporal, y los
+binarios precompilados, en un directorio temporal.
+
+    python -m benchmarks.bench_load [--learners N] [--rounds N] [--clients N]
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from benchmarks.common import basedir, rss_kb, summarize
+
+# Rondas entre dos cambios de lección
+SWITCH_EVERY = 5
+WRONG_ANSWER = 'xyzzy'
+
+
+class TestClientTransport:
+    """Peticiones a través del cliente de pruebas de Flask, con su propia cookie."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, form=None, json_body=None):
+        response = self.client.open(path, method=method, data=form, json=json_body)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HttpTransport:
+    """Peticiones HTTP reales a base_url, con un tarro de cookies por alumno."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, method, path, form=None, json_body=None):
+        headers = {}
+        data = None
+        if json_body is not None:
+            data = json.dumps(json_body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        elif form is not None:
+            data = urllib.parse.urlencode(form).encode('utf-8')
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers,
+                                     method=method)
+        try:
+            with self.opener.open(req, timeout=30) as response:
+                status, body = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, body = e.code, e.read()
+        try:
+            return status, json.loads(body)
+        except ValueError:
+            return status, None
+
+
+def simulate_learner(transport, lesson_keys, rounds, rng):
+    """
+    Recorre rounds rondas de práctica de un alumno.
+
+    Devuelve (duraciones por ruta, peticiones fallidas, respuestas
+    correctas aceptadas, respuestas correctas enviadas).
+    """
+    import dictionaries
+
+    timings = {}
+    failures = 0
+
+    def call(path, method='POST', form=None, json_body=None):
+        nonlocal failures
+        started = time.perf_counter()
+        status, body = transport.request(method, path, form, json_body)
+        timings.setdefault(path, []).append(time.perf_counter() - started)
+        if status != 200:
+            failures += 1
+        return body or {}
+
+    accepted = attempted = 0
+    call('/', method='GET')
+    for round_number in range(1, rounds + 1):
+        call('/new_word')
+        call('/check', form={'translation': WRONG_ANSWER})
+        help_body = call('/help')
+        # Responde con la primera traducción que muestra la ayuda, como haría el alumno
+        answers = dictionaries.parse_translations(help_body.get('translations', ''))
+        if answers:
+            attempted += 1
+            result = call('/check', form={'translation': answers[0]})
+            accepted += result.get('status') == 'correct'
+        if round_number % SWITCH_EVERY == 0:
+            call('/switch_lesson', json_body={'lesson_key': rng.choice(lesson_keys)})
+    return timings, failures, accepted, attempted
+
+def _run_learners(make_transport, lesson_keys, learners, rounds, clients, seed):
+    def learner(i):
+        return simulate_learner(make_transport(), lesson_keys, rounds, random.Random(seed + i))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        outcomes = list(pool.map(learner, range(learners)))
+    elapsed = time.perf_counter() - started
+
+    timings = {}
+    failures = accepted = attempted = 0
+    for learner_timings, learner_failures, learner_accepted, learner_attempted in outcomes:
+        for path, values in learner_timings.items():
+            timings.setdefault(path, []).extend(values)
+        failures += learner_failures
+        accepted += learner_accepted
+        attempted += learner_attempted
+    requests = sum(len(values) for values in timings.values())
+    return {
+        'clients': clients,
+        'requests_count': requests,
+        'failures_count': failures,
+        'elapsed_s': elapsed,
+        'requests_per_second': requests / elapsed if elapsed else 0.0,
+        # Proporción de respuestas correctas aceptadas; si baja, la simulación no es válida
+        'accepted_ratio': accepted / attempted if attempted else None,
+        'routes': {path: summarize(values) for path, values in sorted(timings.items())},
+    }
+
+
+class _ThreadingWSGIServer(socketserver.ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def run_wsgi_server(app, lesson_keys, learners, rounds, clients, seed):
+    server = make_server('127.0.0.1', 0, app, server_class=_ThreadingWSGIServer,
+                         handler_class=_QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+    try:
+        return _run_learners(lambda: HttpTransport(base_url), lesson_keys,
+                             learners, rounds, clients, seed)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+# --- Arranque en frío ----------------------------------------------------
+
+def _cold_start_child(learners, rounds):
+    """Se ejecuta en el proceso hijo: importa la app, atiende alumnos e informa."""
+    started = time.perf_counter()
+    import app as app_module
+    imported = time.perf_counter()
+    client = app_module.app.test_client()
+    client.get('/')
+    first_request = time.perf_counter()
+    report = {
+        'ready_at': time.time(),
+        'import_s': imported - started,
+        'first_request_s': first_request - imported,
+        'rss_kb': rss_kb(),
+    }
+    lesson_keys = list(app_module.available_lessons)
+    _run_learners(lambda: TestClientTransport(app_module.app), lesson_keys,
+                  learners, rounds, 1, 0)
+    report['rss_after_load_kb'] = rss_kb()
+    print(json.dumps(report))
+
+def _spawn_cold_start(env, learners, rounds):
+    started = time.time()
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_load', '--cold-start-child',
+         '--learners', str(learners), '--rounds', str(rounds)],
+        cwd=basedir, env=env, capture_output=True, text=True, check=True).stdout
+    report = json.loads(output.strip().splitlines()[-1])
+    # Desde que se lanza el proceso hasta que ha atendido la primera petición,
+    # incluido el arranque del intérprete
+    report['startup_s'] = report.pop('ready_at') - started
+    return report
+
+def run_cold_start(tmpdir, repeat=3, learners=5, rounds=10):
+    """
+    Arranque de un worker con binarios precompilados (generados en tmpdir)
+    y analizando los XML. De cada medida se da la mediana de repeat procesos.
+    """
+    base_env = dict(os.environ, PROGRESS_DB=os.path.join(tmpdir, 'cold.db'),
+                    LESSON_WATCH_INTERVAL='0')
+    compiled_env = dict(base_env, COMPILED_DICTIONARY_DIR=os.path.join(tmpdir, 'compiled'))
+    xml_env = dict(base_env, COMPILED_DICTIONARY_DIR=os.path.join(tmpdir, 'empty'))
+    subprocess.run([sys.executable, 'dictionaries.py', 'compile'], cwd=basedir,
+                   env=compiled_env, capture_output=True, check=True)
+    results = {}
+    for label, env in (('compiled', compiled_env), ('xml', xml_env)):
+        reports = [_spawn_cold_start(env, learners, rounds) for _ in range(repeat)]
+        results[label] = {key: sorted(report[key] for report in reports)[len(reports) // 2]
+                          for key in reports[0]}
+    return results
+
+
+def run(learners=20, rounds=20, clients=4, seed=0, cold_start_repeat=3):
+    """
+    Carga y arranque en frío. La app del proceso usa siempre binarios
+    precompilados en un directorio temporal, para que el resultado no
+    dependa de si se ha ejecutado antes `dictionaries.py compile`.
+    """
+    import dictionaries
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        compiled_dir = os.path.join(tmpdir, 'compiled')
+        saved_env = {name: os.environ.get(name) for name in ('PROGRESS_DB', 'COMPILED_DICTIONARY_DIR')}
+        saved_compiled_dir = dictionaries.COMPILED_DIR
+        os.environ['PROGRESS_DB'] = os.path.join(tmpdir, 'progress.db')
+        os.environ['COMPILED_DICTIONARY_DIR'] = compiled_dir
+        # dictionaries lee COMPILED_DICTIONARY_DIR al importarse, quizá ya antes
+        dictionaries.COMPILED_DIR = compiled_dir
+        try:
+            dictionaries.compile_lessons()
+            # Si la app ya estaba importada, sus diccionarios se cargaron antes
+            mode = 'preloaded' if 'app' in sys.modules else 'compiled'
+            import app as app_module
+            app_module.scheduler.rng.seed(seed)
+            lesson_keys = list(app_module.available_lessons)
+            results = {
+                'learners': learners,
+                'rounds': rounds,
+                'lessons': lesson_keys,
+                'dictionaries': mode,
+                'test_client': _run_learners(lambda: TestClientTransport(app_module.app),
+                                             lesson_keys, learners, rounds, 1, seed),
+                'wsgi_server': run_wsgi_server(app_module.app, lesson_keys, learners, rounds,
+                                               clients, seed),
+            }
+            app_module.progress.flush()
+            results['rss_kb'] = rss_kb()
+            if cold_start_repeat:
+                results['cold_start'] = run_cold_start(tmpdir, cold_start_repeat)
+        finally:
+            dictionaries.COMPILED_DIR = saved_compiled_dir
+            for name, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+    return results
+
+def print_report(results):
+    for mode in ('test_client', 'wsgi_server'):
+        stats = results[mode]
+        print(f"{mode} ({stats['clients']} clientes): {stats['requests_count']} peticiones "
+              f"en {stats['elapsed_s']:.2f} s, {stats['requests_per_second']:.0f} pet/s, "
+              f"{stats['failures_count']} fallidas, "
+              f"respuestas correctas aceptadas {stats['accepted_ratio']:.0%}")
+        for path, route in stats['routes'].items():
+            print(f"  {path:<16} n={route['count']:<6} p50 {route['p50_ms']:.2f} ms  "
+                  f"p95 {route['p95_ms']:.2f} ms  p99 {route['p99_ms']:.2f} ms")
+    print(f"RSS del proceso de prueba: {results['rss_kb']} KB")
+    for label, stats in results.get('cold_start', {}).items():
+        print(f"arranque en frío ({label}): total {stats['startup_s'] * 1000:.0f} ms, "
+              f"import {stats['import_s'] * 1000:.0f} ms, "
+              f"primera petición {stats['first_request_s'] * 1000:.1f} ms, "
+              f"RSS {stats['rss_kb']} KB (tras atender alumnos {stats['rss_after_load_kb']} KB)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--learners', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--clients', type=int, default=4,
+                        help="Clientes simultáneos contra el servidor WSGI.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cold-start-repeat', type=int, default=3,
+                        help="Procesos por medida de arranque en frío (0 lo omite).")
+    parser.add_argument('--cold-start-child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.cold_start_child:
+        _cold_start_child(args.learners, args.rounds)
+        return
+    print_report(run(args.learners, args.rounds, args.clients, args.seed,
+                     args.cold_start_repeat))
+
+if __name__ == '__main__':
+    main()
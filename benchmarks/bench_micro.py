@@ -0,0 +1,112 @@
+"""
+Microbenchmarks del cargador de diccionarios y de la normalización.
+
+- load_dictionary: análisis del XML de cada lección, frente a mapear su
+  binario precompilado (si está al día).
+- parse_translations: ver bench_parse_translations.
+- lookups: coste por llamada de answer_set, lookup_normalized y
+  spanish_for sobre el diccionario principal tal y como lo usa la app
+  (mapeado si hay binario al día), que los resuelven por bisección.
+- normalize_text: coste por llamada del camino lento original y sin
+  caché, sobre todas las palabras y respuestas del diccionario, y de un
+  acierto de la caché.
+
+    python -m benchmarks.bench_micro [--repeat N]
+"""
+import argparse
+import random
+import time
+
+import dictionaries
+from benchmarks import bench_parse_translations
+from benchmarks.common import best_of
+
+
+def bench_load_dictionary(repeat=3):
+    results = {}
+    for dict_key, lesson in dictionaries.available_lessons.items():
+        stats = {'xml_s': best_of(repeat, dictionaries.load_dictionary, dict_key)}
+        stats['words'] = len(dictionaries.load_dictionary(dict_key))
+        signature = dictionaries._file_signature(lesson['file'])
+        if dictionaries.load_compiled(dict_key, signature) is not None:
+            stats['mmap_s'] = best_of(repeat, dictionaries.load_compiled, dict_key, signature)
+        results[dict_key] = stats
+    return results
+
+def bench_lookups(repeat=3, samples=2000, seed=0):
+    store = dictionaries.get_dictionary()
+    words = random.Random(seed).sample(list(store.words), min(samples, len(store.words)))
+    answers = [min(store.answer_set(word)) for word in words]
+
+    def per_call_ns(function, args):
+        seconds = best_of(repeat, lambda: [function(arg) for arg in args])
+        return seconds / len(args) * 1e9
+
+    return {
+        'answer_set_ns': per_call_ns(store.answer_set, words),
+        'lookup_normalized_ns': per_call_ns(store.lookup_normalized, words),
+        'spanish_for_ns': per_call_ns(store.spanish_for, answers),
+    }
+
+def bench_normalize_text(repeat=3):
+    store = dictionaries.load_dictionary()
+    texts = list(store.words)
+    for word in store.words:
+        texts.extend(store.translations(word))
+    uncached = dictionaries.normalize_text.__wrapped__
+    slow = dictionaries._normalize_text_slow
+
+    def per_call_ns(function):
+        seconds = best_of(repeat, lambda: [function(text) for text in texts])
+        return seconds / len(texts) * 1e9
+
+    results = {
+        'texts': len(texts),
+        'slow_ns': per_call_ns(slow),
+        'uncached_ns': per_call_ns(uncached),
+    }
+    # Los aciertos se miden sobre un conjunto que cabe en la caché; con todos
+    # los textos la LRU los iría expulsando y sólo habría fallos
+    texts = texts[:dictionaries.normalize_text.cache_parameters()['maxsize'] // 2]
+    dictionaries.normalize_text.cache_clear()
+    for text in texts:
+        dictionaries.normalize_text(text)
+    results['cached_ns'] = per_call_ns(dictionaries.normalize_text)
+    return results
+
+def run(repeat=3):
+    dictionaries.discover_lessons()
+    started = time.perf_counter()
+    results = {
+        'load_dictionary': bench_load_dictionary(repeat),
+        'parse_translations': bench_parse_translations.run(repeat),
+        'lookups': bench_lookups(repeat),
+        'normalize_text': bench_normalize_text(repeat),
+    }
+    results['elapsed_s'] = time.perf_counter() - started
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+    results = run(args.repeat)
+    for dict_key, stats in results['load_dictionary'].items():
+        line = (f"load_dictionary {dict_key}: XML {stats['xml_s'] * 1000:.1f} ms "
+                f"({stats['words']} palabras)")
+        if 'mmap_s' in stats:
+            line += f", binario {stats['mmap_s'] * 1000:.3f} ms"
+        print(line)
+    for dict_key, stats in results['parse_translations'].items():
+        print(f"parse_translations {dict_key}: {stats['per_entry_s'] * 1000:.1f} ms, "
+              f"por lotes {stats['batch_s'] * 1000:.1f} ms (x{stats['speedup']:.1f})")
+    stats = results['lookups']
+    print(f"answer_set {stats['answer_set_ns']:.0f} ns, "
+          f"lookup_normalized {stats['lookup_normalized_ns']:.0f} ns, "
+          f"spanish_for {stats['spanish_for_ns']:.0f} ns")
+    stats = results['normalize_text']
+    print(f"normalize_text ({stats['texts']} textos): lento {stats['slow_ns']:.0f} ns, "
+          f"sin caché {stats['uncached_ns']:.0f} ns, con caché {stats['cached_ns']:.0f} ns")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Microbenchmark de la compilación de traducciones por lotes.
+
+Compara los tiempos de parse_translations y compile_translations sobre cada
+<d> de dict_es_en.xml y de lessons/*.xml. Que ambas devuelvan lo mismo se
+comprueba en tests/test_translations.py.
+
+    python -m benchmarks.bench_parse_translations [--repeat N]
+"""
+import argparse
+import time
+import xml.etree.ElementTree as ET
+
+import dictionaries
+
+
+def translation_texts(path):
+    """Texto <d> de cada <w> del archivo (cadena vacía si falta)."""
+    texts = []
+    for _, elem in ET.iterparse(path):
+        if elem.tag == 'w':
+            d = elem.find('d')
+            texts.append(d.text if d is not None and d.text is not None else "")
+            elem.clear()
+    return texts
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        # Sin caché caliente de normalize_text, como en un worker recién arrancado
+        dictionaries.normalize_text.cache_clear()
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def run(repeat=3):
+    dictionaries.discover_lessons()
+    results = {}
+    for dict_key, lesson in dictionaries.available_lessons.items():
+        texts = translation_texts(lesson['file'])
+        per_entry = best_of(repeat, lambda: [dictionaries.parse_translations(t) for t in texts])
+        batched = best_of(repeat, lambda: dictionaries.compile_translations(texts))
+        results[dict_key] = {
+            'texts': len(texts),
+            'per_entry_s': per_entry,
+            'batch_s': batched,
+            'speedup': per_entry / batched if batched else float('inf'),
+        }
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+    for dict_key, stats in run(args.repeat).items():
+        print(f"{dict_key}: {stats['texts']} textos; "
+              f"parse_translations {stats['per_entry_s'] * 1000:.1f} ms, "
+              f"compile_translations {stats['batch_s'] * 1000:.1f} ms "
+              f"(x{stats['speedup']:.1f})")
+
+if __name__ == '__main__':
+    main()
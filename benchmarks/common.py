@@ -0,0 +1,124 @@
+"""
+Utilidades compartidas por los benchmarks: percentiles, memoria del
+proceso y resultados en JSON comparables entre commits.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+basedir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+def summarize(seconds):
+    """p50/p95/p99, media y máximo en milisegundos de una lista de duraciones en segundos."""
+    if not seconds:
+        return {'count': 0}
+    values = sorted(seconds)
+    return {
+        'count': len(values),
+        'p50_ms': percentile(values, 0.50) * 1000,
+        'p95_ms': percentile(values, 0.95) * 1000,
+        'p99_ms': percentile(values, 0.99) * 1000,
+        'mean_ms': sum(values) / len(values) * 1000,
+        'max_ms': values[-1] * 1000,
+    }
+
+def best_of(repeat, function, *args):
+    """Menor tiempo en segundos de repeat ejecuciones de function(*args)."""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def rss_kb():
+    """Memoria residente actual del proceso en KB (el pico si no hay /proc)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS informa en bytes; Linux y el resto, en KB
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+def metadata():
+    """Commit, versión de Python y máquina, para saber qué se está comparando."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=basedir,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                    cwd=basedir, capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+    return {
+        'commit': commit,
+        'dirty': dirty,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+def write_json(path, results):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False, sort_keys=True)
+        f.write('\n')
+
+def read_json(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+# --- Comparación entre resultados ----------------------------------------
+
+# Sufijos de las métricas en las que más es mejor; en el resto, menos es mejor
+_HIGHER_IS_BETTER = ('per_second', 'speedup', 'matched', 'ratio')
+
+def _flatten(results, prefix=''):
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            yield from _flatten(value, name + '.')
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+
+def compare(old, new, threshold=0.10):
+    """
+    Compara dos resultados (sin 'meta') y devuelve filas (métrica, antes,
+    después, cambio relativo, empeora) de las métricas presentes en ambos
+    cuyo valor ha cambiado.
+
+    Una métrica empeora si cambia más de threshold en la dirección mala.
+    """
+    old_values = dict(_flatten({k: v for k, v in old.items() if k != 'meta'}))
+    rows = []
+    for name, after in _flatten({k: v for k, v in new.items() if k != 'meta'}):
+        before = old_values.get(name)
+        # Los recuentos y parámetros que no cambian no aportan nada
+        if before is None or before == after or name.endswith('count'):
+            continue
+        change = (after - before) / before if before else 0.0
+        higher_is_better = name.endswith(_HIGHER_IS_BETTER)
+        worse = change < -threshold if higher_is_better else change > threshold
+        rows.append((name, before, after, change, worse))
+    return rows
+
+def print_comparison(rows):
+    for name, before, after, change, worse in rows:
+        flag = '  <-- peor' if worse else ''
+        print(f"{name:<60} {before:>12.6g} {after:>12.6g} {change:>+8.1%}{flag}")
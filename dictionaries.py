@@ -0,0 +1,1212 @@
+"""
+Carga, compilación y caché de los diccionarios de lecciones.
+
+Uso desde la línea de comandos para precompilar los XML a formato binario:
+
+    python dictionaries.py compile [lección ...]
+"""
+import xml.etree.ElementTree as ET
+import argparse
+import bisect
+import functools
+import glob
+import itertools
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import unicodedata
+from array import array
+from collections import namedtuple
+from collections.abc import Mapping, Sequence
+
+import metrics
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+
+# Directorio donde se guardan los diccionarios precompilados (ver compile_lessons)
+COMPILED_DIR = os.environ.get('COMPILED_DICTIONARY_DIR', os.path.join(basedir, 'compiled'))
+
+MAIN_DICTIONARY = 'dict_es_en.xml'
+
+# Lecciones disponibles y diccionarios cargados
+# NOTA: En Gunicorn, cada worker tendrá su propia copia.
+available_lessons = {}
+
+# Clave de lección -> (firma del XML, EntryStore del principal o LessonView).
+# Sólo se modifica bajo _refresh_lock y cada entrada (o el dict entero, si
+# cambia el principal) se sustituye de una vez, así que las peticiones lo
+# leen sin bloquear.
+_dictionaries = {}
+_refresh_lock = threading.Lock()
+
+# Segundos entre comprobaciones de las lecciones en disco (0 desactiva el vigilante)
+LESSON_WATCH_INTERVAL = float(os.environ.get('LESSON_WATCH_INTERVAL', '2'))
+_watcher = None
+_watcher_stop = None
+_watcher_pid = None
+_watcher_interval = 0
+
+# Entradas que iter_entries acumula antes de compilar sus traducciones
+_ENTRY_BATCH_SIZE = 4096
+
+# Estadísticas de la última carga desde XML de cada lección (ver _parse_lesson_xml)
+load_stats = {}
+
+_LOAD_SECONDS = metrics.REGISTRY.histogram(
+    'dictionary_load_seconds',
+    'Tiempo de carga de diccionarios por lección y etapa '
+    '(parse: XML completo, translations: compilación de traducciones, mmap: binario, '
+    'write: escritura del binario, view: vista de lección)',
+    ('lesson', 'stage'),
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+_LOADS = metrics.REGISTRY.counter(
+    'dictionary_loads_total',
+    'Cargas de diccionarios por lección y origen (compiled, xml, fallback, previous)',
+    ('lesson', 'source'))
+_LOOKUPS = metrics.REGISTRY.counter(
+    'dictionary_cache_lookups_total',
+    'Llamadas a get_dictionary resueltas con el diccionario ya cargado (hit) o recargando (miss)',
+    ('result',))
+_LOOKUP_HIT = _LOOKUPS.labels('hit')
+_LOOKUP_MISS = _LOOKUPS.labels('miss')
+
+def _normalize_text_slow(text):
+    text = unicodedata.normalize('NFD', text)
+    text = ''.join(char for char in text if unicodedata.category(char) != 'Mn')
+    return text.lower().strip()
+
+def _build_accent_table():
+    """Tabla para str.translate con lo que deja _normalize_text_slow de cada carácter latino."""
+    table = {}
+    code_points = itertools.chain(range(0x80, 0x250),      # Latin-1 y Latin extendido A/B
+                                  range(0x300, 0x370),     # diacríticos combinables
+                                  range(0x1E00, 0x1F00))   # Latin extendido adicional
+    for cp in code_points:
+        char = chr(cp)
+        folded = ''.join(c for c in unicodedata.normalize('NFD', char)
+                         if unicodedata.category(c) != 'Mn')
+        if folded != char:
+            table[cp] = folded
+    return table
+
+_ACCENT_TABLE = _build_accent_table()
+
+@functools.lru_cache(maxsize=65536)
+def normalize_text(text):
+    """Normaliza el texto quitando acentos y convirtiendo a minúsculas."""
+    # Camino rápido: si el texto (o lo que queda tras quitar los acentos
+    # latinos) es ASCII, el resultado coincide con el de NFD + filtrado
+    # carácter a carácter.
+    if text.isascii():
+        return text.lower().strip()
+    folded = text.translate(_ACCENT_TABLE)
+    if folded.isascii():
+        return folded.lower().strip()
+    return _normalize_text_slow(text)
+
+metrics.register_lru_cache('normalize_text', normalize_text)
+
+def parse_translations(translations_text):
+    """Analiza un texto de traducciones y extrae todas las posibles traducciones."""
+    if not translations_text:
+        return []
+    translations = [t.strip() for t in re.split('[,;]', translations_text)]
+    normalized_translations = []
+    for translation in translations:
+        if not translation:
+            continue
+        cleaned = re.sub(r'\{[mfn]\}', '', translation).strip()
+        cleaned = re.sub(r'\[[^\]]+\]', '', cleaned).strip()
+        if '(' in cleaned and ')' in cleaned:
+            without_parentheses = re.sub(r'\s*\([^)]*\)', '', cleaned).strip()
+            if without_parentheses:
+                normalized_translations.append(normalize_text(without_parentheses))
+            normalized_translations.append(normalize_text(cleaned))
+        else:
+            normalized_translations.append(normalize_text(cleaned))
+        if cleaned.strip().lower().startswith('to '):
+            without_to = cleaned[3:].strip()
+            if without_to:
+                if '(' in without_to and ')' in without_to:
+                    without_parentheses = re.sub(r'\s*\([^)]*\)', '', without_to).strip()
+                    if without_parentheses:
+                        normalized_translations.append(normalize_text(without_parentheses))
+                normalized_translations.append(normalize_text(without_to))
+    seen = set()
+    result = []
+    for translation in normalized_translations:
+        if translation and translation not in seen:
+            seen.add(translation)
+            result.append(translation)
+    return result
+
+_GENDER_RE = re.compile(r'\{[mfn]\}')
+_REGION_RE = re.compile(r'\[[^\]]+\]')
+_PARENTHESES_RE = re.compile(r'\s*\([^)]*\)')
+
+
+class TranslationCompiler:
+    """
+    Versión por lotes de parse_translations.
+
+    Produce exactamente el mismo resultado, pero procesa el lote por etapas
+    en lugar de texto a texto:
+
+    1. trocea los textos distintos por ',' y ';' y reúne los fragmentos distintos;
+    2. quita las marcas de género y región de todos los fragmentos con una
+       sola sustitución sobre todos ellos unidos;
+    3. normaliza cada fragmento limpio una sola vez; sólo los que tienen
+       paréntesis o empiezan por 'to ' generan variantes adicionales;
+    4. compone la tupla sin repetidos de cada texto.
+
+    Lo ya visto en lotes anteriores (textos, fragmentos) se reutiliza. Las
+    tuplas devueltas se comparten entre textos iguales.
+    """
+
+    __slots__ = ('_texts', '_fragments', 'seconds')
+
+    # Separador para procesar muchos fragmentos en una sola pasada; el XML
+    # no admite este carácter y ninguna de las transformaciones lo altera.
+    _JOIN = '\x00'
+    _JOINED_REGION_RE = re.compile(r'\[[^\]\x00]+\]')
+
+    def __init__(self):
+        self._texts = {}
+        self._fragments = {}
+        # Tiempo acumulado en compile, para las estadísticas de carga
+        self.seconds = 0.0
+
+    @staticmethod
+    def _variants(cleaned):
+        """Variantes de un fragmento con paréntesis o 'to ', como en parse_translations."""
+        normalize = normalize_text.__wrapped__
+        raw = []
+        if '(' in cleaned and ')' in cleaned:
+            without_parentheses = _PARENTHESES_RE.sub('', cleaned).strip()
+            if without_parentheses:
+                raw.append(without_parentheses)
+        raw.append(cleaned)
+        if cleaned.lower().startswith('to '):
+            without_to = cleaned[3:].strip()
+            if without_to:
+                if '(' in without_to and ')' in without_to:
+                    without_parentheses = _PARENTHESES_RE.sub('', without_to).strip()
+                    if without_parentheses:
+                        raw.append(without_parentheses)
+                raw.append(without_to)
+        return tuple(dict.fromkeys(v for v in map(normalize, raw) if v))
+
+    def _compile_fragments(self, fragments):
+        normalize = normalize_text.__wrapped__
+        stripped = [fragment.strip() for fragment in fragments]
+        joined = _GENDER_RE.sub('', self._JOIN.join(stripped))
+        cleaned_all = self._JOINED_REGION_RE.sub('', joined).split(self._JOIN)
+        known = self._fragments
+        for fragment, cleaned in zip(fragments, cleaned_all):
+            cleaned = cleaned.strip()
+            if '(' in cleaned or cleaned[:3].lower() == 'to ':
+                known[fragment] = self._variants(cleaned)
+                continue
+            normalized = cleaned.lower().strip() if cleaned.isascii() else normalize(cleaned)
+            known[fragment] = (normalized,) if normalized else ()
+
+    def compile(self, texts):
+        """Respuestas de cada texto de traducciones, en el mismo orden."""
+        started = time.perf_counter()
+        try:
+            return self._compile(texts)
+        finally:
+            self.seconds += time.perf_counter() - started
+
+    def _compile(self, texts):
+        if any(self._JOIN in text for text in texts if text):
+            return [tuple(parse_translations(text)) for text in texts]
+        known_texts = self._texts
+        known_fragments = self._fragments
+        pending = [text for text in dict.fromkeys(texts) if text not in known_texts]
+        # Trocear con replace/split equivale a re.split('[,;]') y es más rápido
+        split_texts = [text.replace(';', ',').split(',') if text else [] for text in pending]
+        new_fragments = [fragment for fragment in dict.fromkeys(
+            fragment for fragments in split_texts for fragment in fragments)
+            if fragment not in known_fragments]
+        if new_fragments:
+            self._compile_fragments(new_fragments)
+        for text, fragments in zip(pending, split_texts):
+            if len(fragments) == 1:
+                known_texts[text] = known_fragments[fragments[0]]
+            else:
+                known_texts[text] = tuple(dict.fromkeys(
+                    variant for fragment in fragments for variant in known_fragments[fragment]))
+        return [known_texts[text] for text in texts]
+
+
+def compile_translations(texts):
+    """Aplica parse_translations a todos los textos de una vez (ver TranslationCompiler)."""
+    return TranslationCompiler().compile(texts)
+
+def discover_lessons():
+    """Descubre todos los archivos de lecciones XML."""
+    lessons = {}
+    filename = MAIN_DICTIONARY
+    lessons[filename] = {
+        'name': 'Diccionario completo',
+        'file': os.path.join(basedir, filename),
+        'type': 'main'
+    }
+    lessons_dir = os.path.join(basedir, 'lessons')
+    if os.path.exists(lessons_dir):
+        lesson_files = sorted(glob.glob(os.path.join(lessons_dir, '*.xml')))
+        for lesson_file in lesson_files:
+            filename = os.path.basename(lesson_file)
+            lesson_name = os.path.splitext(filename)[0]
+            display_name = f"Lección {lesson_name}"
+            lessons[filename] = {
+                'name': display_name,
+                'file': lesson_file,
+                'type': 'lesson'
+            }
+    # Se modifica en el sitio para que los módulos que lo importaron vean los
+    # cambios, y sólo si los hay, porque las plantillas lo recorren
+    if lessons != available_lessons:
+        for stale in available_lessons.keys() - lessons.keys():
+            del available_lessons[stale]
+        available_lessons.update(lessons)
+    return available_lessons
+
+def compile_lessons(lesson_keys=None, force=False):
+    """
+    Precompila las lecciones indicadas (o todas) al formato binario.
+
+    Devuelve la lista de rutas escritas; las lecciones cuyo binario ya está
+    al día se omiten salvo que se pase force=True.
+    """
+    if not available_lessons:
+        discover_lessons()
+    if lesson_keys is None:
+        lesson_keys = list(available_lessons)
+    written = []
+    for dict_key in lesson_keys:
+        if dict_key not in available_lessons:
+            raise KeyError(f"Lección desconocida: {dict_key}")
+        source = available_lessons[dict_key]['file']
+        # La firma se toma antes de analizar: si el XML cambia durante la
+        # compilación, el binario quedará obsoleto y se volverá a generar.
+        signature = _file_signature(source)
+        if signature is None:
+            raise FileNotFoundError(source)
+        if not force and load_compiled(dict_key, signature) is not None:
+            continue
+        store = _parse_lesson_xml(source, dict_key)
+        written.append(write_compiled(dict_key, store, signature))
+    return written
+
+
+Sense = namedtuple('Sense', ('translations', 'original_translations', 'definition'))
+
+
+class EntryStore(Mapping):
+    """
+    Almacén compacto e inmutable de las entradas de una lección.
+
+    Cada palabra en español puede tener varias acepciones (<w> repetidas con
+    la misma <c>). Las acepciones se guardan en arrays paralelos de ids de
+    cadena y las palabras, ordenadas, apuntan a su rango de acepciones:
+
+        words[i]                            i-ésima palabra (orden de str)
+        sense_start[i]:sense_start[i + 1]   sus acepciones
+        originals[s], definitions[s]        ids de cadena de la acepción s
+        variant_start[s]:variant_start[s + 1]  sus respuestas en variants
+
+    Los índices de búsqueda son pares de arrays ordenados por la cadena de
+    la clave (y después por palabra), que se consultan por bisección:
+
+        word_keys[k], word_ids[k]       palabra sin acentos ni mayúsculas -> palabra
+        answer_keys[k], answer_ids[k]   respuesta aceptada -> palabra
+
+    Los arrays pueden ser array('I') en memoria o vistas de un binario
+    mapeado (ver load_compiled); la clase no distingue entre ambos, y nada
+    se copia al heap del worker al cargarlo. Se comparte entre todos los
+    hilos del worker y no se modifica nunca.
+    """
+
+    __slots__ = ('strings', 'words', 'sense_start', 'originals', 'definitions',
+                 'variant_start', 'variants', 'word_keys', 'word_ids',
+                 'answer_keys', 'answer_ids', '_buffer')
+
+    def __init__(self, strings, words, sense_start, originals, definitions,
+                 variant_start, variants, word_keys, word_ids, answer_keys,
+                 answer_ids, buffer=None):
+        self.strings = strings
+        # Secuencia ordenada para buscar por bisección y elegir palabras al azar
+        self.words = words
+        self.sense_start = sense_start
+        self.originals = originals
+        self.definitions = definitions
+        self.variant_start = variant_start
+        self.variants = variants
+        self.word_keys = word_keys
+        self.word_ids = word_ids
+        self.answer_keys = answer_keys
+        self.answer_ids = answer_ids
+        # Mantiene vivo el mmap del que salen las vistas, si lo hay
+        self._buffer = buffer
+
+    @property
+    def sense_count(self):
+        return len(self.originals)
+
+    def _answer_set_at(self, i):
+        strings = self.strings
+        first, last = self.sense_start[i], self.sense_start[i + 1]
+        return frozenset(strings[sid] for sid in
+                         self.variants[self.variant_start[first]:self.variant_start[last]])
+
+    def answer_set(self, word):
+        """frozenset de respuestas normalizadas aceptadas para la palabra."""
+        i = self.index(word)
+        if i < 0:
+            return frozenset()
+        return self._answer_set_at(i)
+
+    def _lookup(self, keys, ids, key):
+        """Posiciones de palabra guardadas bajo key en el índice (keys, ids)."""
+        sorted_keys = _IndexKeys(self.strings, keys)
+        lo = bisect.bisect_left(sorted_keys, key)
+        hi = bisect.bisect_right(sorted_keys, key, lo)
+        return ids[lo:hi]
+
+    def word_positions(self, normalized_word):
+        """Posiciones de las palabras cuya forma normalizada es normalized_word."""
+        return self._lookup(self.word_keys, self.word_ids, normalized_word)
+
+    def answer_positions(self, answer):
+        """Posiciones de las palabras que aceptan la respuesta normalizada answer."""
+        return self._lookup(self.answer_keys, self.answer_ids, answer)
+
+    def lookup_normalized(self, word):
+        """Palabras que coinciden con word ignorando acentos y mayúsculas."""
+        return tuple(self.words[i] for i in self.word_positions(normalize_text(word)))
+
+    def spanish_for(self, english):
+        """Palabras en español que aceptan english como traducción (modo inglés -> español)."""
+        return tuple(self.words[i] for i in self.answer_positions(normalize_text(english)))
+
+    def index(self, word):
+        """Posición de la palabra en words, o -1 si no está."""
+        if not isinstance(word, str):
+            return -1
+        i = bisect.bisect_left(self.words, word)
+        if i < len(self.words) and self.words[i] == word:
+            return i
+        return -1
+
+    def sense_range(self, word):
+        """Rango de ids de acepción de la palabra (vacío si no está)."""
+        i = self.index(word)
+        if i < 0:
+            return range(0)
+        return range(self.sense_start[i], self.sense_start[i + 1])
+
+    def sense(self, sense_id):
+        strings = self.strings
+        return Sense(
+            tuple(strings[sid] for sid in
+                  self.variants[self.variant_start[sense_id]:self.variant_start[sense_id + 1]]),
+            strings[self.originals[sense_id]],
+            strings[self.definitions[sense_id]],
+        )
+
+    def senses(self, word):
+        """Todas las acepciones de la palabra, en el orden del XML."""
+        return tuple(self.sense(s) for s in self.sense_range(word))
+
+    def translations(self, word):
+        """Respuestas normalizadas aceptadas para la palabra, en cualquiera de sus acepciones."""
+        strings = self.strings
+        seen = {}
+        for s in self.sense_range(word):
+            for sid in self.variants[self.variant_start[s]:self.variant_start[s + 1]]:
+                seen.setdefault(sid, None)
+        return tuple(strings[sid] for sid in seen)
+
+    def __contains__(self, word):
+        return self.index(word) >= 0
+
+    def __getitem__(self, word):
+        senses = self.senses(word)
+        if not senses:
+            raise KeyError(word)
+        return senses
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __len__(self):
+        return len(self.words)
+
+
+class _IndexKeys(Sequence):
+    """Cadenas de las claves de un índice, resueltas bajo demanda para la bisección."""
+
+    __slots__ = ('_strings', '_keys')
+
+    def __init__(self, strings, keys):
+        self._strings = strings
+        self._keys = keys
+
+    def __getitem__(self, index):
+        return self._strings[self._keys[index]]
+
+    def __len__(self):
+        return len(self._keys)
+
+
+def _sorted_index(pairs, intern):
+    """Arrays (claves, posiciones) de los pares (texto, posición), ordenados por texto."""
+    keys = array('I')
+    ids = array('I')
+    for text, i in sorted(pairs):
+        keys.append(intern(text))
+        ids.append(i)
+    return keys, ids
+
+def build_store(entries):
+    """
+    Construye un EntryStore a partir de tuplas como las de iter_entries.
+
+    Conserva todas las acepciones de cada palabra e interna las cadenas para
+    que las repetidas (definiciones como '{m}', respuestas comunes) se
+    guarden una sola vez.
+    """
+    by_word = {}
+    for spanish_word, english_translations, definition, possible_translations in entries:
+        by_word.setdefault(spanish_word, []).append(
+            (english_translations or '', definition or '', possible_translations))
+
+    words = sorted(by_word)
+    strings = [sys.intern(word) for word in words]
+    string_ids = {word: i for i, word in enumerate(words)}
+
+    def intern(text):
+        sid = string_ids.get(text)
+        if sid is None:
+            sid = string_ids[text] = len(strings)
+            strings.append(sys.intern(text))
+        return sid
+
+    sense_start = array('I', [0])
+    originals = array('I')
+    definitions = array('I')
+    variant_start = array('I', [0])
+    variants = array('I')
+    answer_pairs = []
+    for i, word in enumerate(words):
+        answers = {}
+        for english_translations, definition, possible_translations in by_word[word]:
+            originals.append(intern(english_translations))
+            definitions.append(intern(definition))
+            variants.extend(intern(t) for t in possible_translations)
+            variant_start.append(len(variants))
+            answers.update(dict.fromkeys(possible_translations))
+        sense_start.append(len(originals))
+        answer_pairs.extend((answer, i) for answer in answers)
+    # Sin pasar por la caché de normalize_text, que es para las peticiones
+    normalize = normalize_text.__wrapped__
+    word_keys, word_ids = _sorted_index(
+        ((normalize(word), i) for i, word in enumerate(words)), intern)
+    answer_keys, answer_ids = _sorted_index(answer_pairs, intern)
+    return EntryStore(strings, strings[:len(words)], sense_start, originals,
+                      definitions, variant_start, variants, word_keys, word_ids,
+                      answer_keys, answer_ids)
+
+EMPTY_STORE = build_store(())
+
+
+class LessonView(Mapping):
+    """
+    Lección representada como vista sobre el diccionario principal.
+
+    ids[i] es el número de entrada de la i-ésima palabra de la lección (en
+    orden de str). Los números menores que len(base) son entradas de base
+    cuyas acepciones coinciden exactamente con las de la lección; los
+    demás, len(base) + j, son entradas propias de la lección añadidas a
+    continuación en extra, un EntryStore pequeño. Así una lección sólo
+    ocupa 4 bytes por palabra compartida.
+
+    Tiene la misma interfaz de lectura que EntryStore, salvo las funciones
+    que trabajan con ids de acepción.
+    """
+
+    __slots__ = ('base', 'extra', 'ids', 'words')
+
+    def __init__(self, base, extra, ids):
+        self.base = base
+        self.extra = extra
+        self.ids = ids
+        self.words = _ViewWords(self)
+
+    def _entry(self, i):
+        """(almacén, posición en el almacén) de la i-ésima palabra."""
+        entry = self.ids[i]
+        base_len = len(self.base.words)
+        if entry < base_len:
+            return self.base, entry
+        return self.extra, entry - base_len
+
+    @property
+    def sense_count(self):
+        count = 0
+        for i in range(len(self.ids)):
+            store, j = self._entry(i)
+            count += store.sense_start[j + 1] - store.sense_start[j]
+        return count
+
+    def index(self, word):
+        """Posición de la palabra en words, o -1 si no está."""
+        if not isinstance(word, str):
+            return -1
+        i = bisect.bisect_left(self.words, word)
+        if i < len(self.ids) and self.words[i] == word:
+            return i
+        return -1
+
+    def _filter(self, key, positions):
+        """Palabras de la vista entre las que positions(store, key) da en base y en extra."""
+        result = []
+        offset = 0
+        for store in (self.base, self.extra):
+            for j in positions(store, key):
+                word = store.words[j]
+                i = self.index(word)
+                if i >= 0 and self.ids[i] == offset + j:
+                    result.append(word)
+            offset = len(self.base.words)
+        return tuple(result)
+
+    def answer_set(self, word):
+        """frozenset de respuestas normalizadas aceptadas para la palabra."""
+        i = self.index(word)
+        if i < 0:
+            return frozenset()
+        store, j = self._entry(i)
+        return store._answer_set_at(j)
+
+    def lookup_normalized(self, word):
+        """Palabras que coinciden con word ignorando acentos y mayúsculas."""
+        return self._filter(normalize_text(word), EntryStore.word_positions)
+
+    def spanish_for(self, english):
+        """Palabras en español que aceptan english como traducción (modo inglés -> español)."""
+        return self._filter(normalize_text(english), EntryStore.answer_positions)
+
+    def senses(self, word):
+        """Todas las acepciones de la palabra, en el orden del XML."""
+        i = self.index(word)
+        if i < 0:
+            return ()
+        store, j = self._entry(i)
+        return tuple(store.sense(s) for s in range(store.sense_start[j], store.sense_start[j + 1]))
+
+    def translations(self, word):
+        """Respuestas normalizadas aceptadas para la palabra, en cualquiera de sus acepciones."""
+        i = self.index(word)
+        if i < 0:
+            return ()
+        return self._entry(i)[0].translations(word)
+
+    def __contains__(self, word):
+        return self.index(word) >= 0
+
+    def __getitem__(self, word):
+        senses = self.senses(word)
+        if not senses:
+            raise KeyError(word)
+        return senses
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class _ViewWords(Sequence):
+    """Palabras de una LessonView, resueltas bajo demanda desde sus almacenes."""
+
+    __slots__ = ('_view',)
+
+    def __init__(self, view):
+        self._view = view
+
+    def __getitem__(self, index):
+        length = len(self._view.ids)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError(index)
+        store, j = self._view._entry(index)
+        return store.words[j]
+
+    def __len__(self):
+        return len(self._view.ids)
+
+
+def build_view(base, lesson):
+    """
+    Construye la LessonView de lesson (un EntryStore) sobre base.
+
+    Las palabras de la lección con las mismas acepciones que en base apuntan
+    a su entrada; el resto se copian a la parte propia de la vista.
+    """
+    base_len = len(base.words)
+    ids = array('I')
+    own_positions = []
+    own_entries = []
+    for word in lesson.words:
+        senses = lesson[word]
+        j = base.index(word)
+        if j >= 0 and base.senses(word) == senses:
+            ids.append(j)
+            continue
+        own_positions.append(len(ids))
+        ids.append(0)
+        for sense in senses:
+            own_entries.append((word, sense.original_translations, sense.definition,
+                                sense.translations))
+    extra = build_store(own_entries)
+    # build_store ordena las palabras igual que lesson.words, así que la
+    # k-ésima palabra propia es la k-ésima de extra
+    for k, position in enumerate(own_positions):
+        ids[position] = base_len + k
+    return LessonView(base, extra, ids)
+
+
+def iter_entries(path, compiler=None):
+    """
+    Recorre en streaming las entradas <w> de un XML de diccionario.
+
+    Genera tuplas (palabra, traducciones originales, definición, traducciones
+    posibles) y libera cada elemento tras procesarlo, de modo que la memoria
+    no crece con el tamaño del archivo. Omite las entradas sin <c> o sin
+    ninguna traducción válida, igual que el cargador original.
+
+    Las traducciones se compilan por lotes de _ENTRY_BATCH_SIZE entradas
+    con un TranslationCompiler común a todo el archivo (compiler, si se pasa).
+    """
+    if compiler is None:
+        compiler = TranslationCompiler()
+    batch = []
+    parents = []
+    for event, elem in ET.iterparse(path, events=('start', 'end')):
+        if event == 'start':
+            parents.append(elem)
+            continue
+        parents.pop()
+        if elem.tag != 'w':
+            continue
+        spanish_word_elem = elem.find('c')
+        english_translations_elem = elem.find('d')
+        definition_elem = elem.find('t')
+        if spanish_word_elem is not None and spanish_word_elem.text is not None:
+            spanish_word = spanish_word_elem.text.strip()
+            english_translations = english_translations_elem.text if english_translations_elem is not None else ""
+            definition = definition_elem.text if definition_elem is not None else ""
+            batch.append((spanish_word, english_translations, definition))
+            if len(batch) >= _ENTRY_BATCH_SIZE:
+                yield from _compile_batch(compiler, batch)
+                batch = []
+        elem.clear()
+        # Suelta también las <w> ya procesadas que cuelgan del elemento padre
+        if parents:
+            parents[-1].clear()
+    yield from _compile_batch(compiler, batch)
+
+def _compile_batch(compiler, batch):
+    all_translations = compiler.compile([entry[1] for entry in batch])
+    for (spanish_word, english_translations, definition), possible_translations in zip(batch, all_translations):
+        if possible_translations:
+            yield spanish_word, english_translations, definition, possible_translations
+
+def _peak_rss_kb():
+    """Pico de memoria residente del proceso en KB, o None si no se puede medir."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS informa en bytes; Linux y el resto, en KB
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+def _parse_lesson_xml(path, dict_key=None, trace_memory=False):
+    """
+    Analiza el XML de una lección y devuelve su EntryStore.
+
+    Registra en load_stats[dict_key] el número de palabras y acepciones, la
+    velocidad de carga y el pico de memoria (y el pico de asignaciones de
+    Python si se pide trace_memory, que ralentiza la carga).
+    """
+    if trace_memory:
+        tracemalloc.start()
+    compiler = TranslationCompiler()
+    started = time.perf_counter()
+    try:
+        store = build_store(iter_entries(path, compiler))
+        peak_alloc = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    elapsed = time.perf_counter() - started
+    dict_key = dict_key or os.path.basename(path)
+    _LOAD_SECONDS.labels(dict_key, 'parse').observe(elapsed)
+    _LOAD_SECONDS.labels(dict_key, 'translations').observe(compiler.seconds)
+    load_stats[dict_key] = {
+        'words': len(store),
+        'entries': store.sense_count,
+        'seconds': elapsed,
+        'translation_seconds': compiler.seconds,
+        'entries_per_second': store.sense_count / elapsed if elapsed else 0.0,
+        'peak_rss_kb': _peak_rss_kb(),
+        'peak_alloc_bytes': peak_alloc,
+    }
+    return store
+
+def load_dictionary(dict_key=None):
+    """
+    Analiza el XML de una lección y devuelve un EntryStore nuevo.
+    """
+    if dict_key is None:
+        dict_key = MAIN_DICTIONARY
+    if dict_key not in available_lessons:
+        return EMPTY_STORE
+    file_to_load = available_lessons[dict_key]['file']
+    try:
+        return _parse_lesson_xml(file_to_load, dict_key)
+    except Exception as e:
+        return build_store([
+            ("casa", "house, home", "{f} /ˈkasa/ (building for living)", ["house", "home"])
+        ])
+
+
+# --- Formato binario precompilado ---------------------------------------
+#
+# Cabecera (little-endian, 44 bytes):
+#   magic, versión, orden de bytes, mtime_ns y tamaño del XML de origen,
+#   nº de palabras, nº de acepciones, nº de cadenas, nº de variantes,
+#   nº de pares (respuesta, palabra)
+# Seguido de los arrays uint32 del EntryStore en el orden de bytes nativo:
+#   offsets[n_strings + 1]        posición de cada cadena en el blob UTF-8
+#   sense_start[n_words + 1]
+#   originals[n_senses]
+#   definitions[n_senses]
+#   variant_start[n_senses + 1]
+#   variants[n_variants]
+#   word_keys[n_words], word_ids[n_words]
+#   answer_keys[n_answers], answer_ids[n_answers]
+# y por último el blob UTF-8 con todas las cadenas sin repetir.
+#
+# Las primeras n_words cadenas son las palabras en español ordenadas, así
+# que la búsqueda se hace por bisección directamente sobre el archivo
+# mapeado, igual que en los índices, que ya vienen ordenados.
+
+COMPILED_MAGIC = b'DICB'
+COMPILED_VERSION = 3
+_HEADER = struct.Struct('<4sHBxqqIIIII')
+_BYTEORDER = {'little': 0, 'big': 1}[sys.byteorder]
+
+
+def _store_tables(store):
+    """Arrays del EntryStore en el orden del binario (sin offsets)."""
+    return (store.sense_start, store.originals, store.definitions, store.variant_start,
+            store.variants, store.word_keys, store.word_ids, store.answer_keys,
+            store.answer_ids)
+
+def compiled_path(dict_key):
+    """Ruta del binario precompilado de una lección."""
+    return os.path.join(COMPILED_DIR, os.path.splitext(dict_key)[0] + '.dicb')
+
+def write_compiled(dict_key, store, signature):
+    """Escribe de forma atómica el binario de una lección y devuelve su ruta."""
+    started = time.perf_counter()
+    blob = bytearray()
+    offsets = array('I', [0])
+    for text in store.strings:
+        blob += text.encode('utf-8')
+        offsets.append(len(blob))
+
+    header = _HEADER.pack(COMPILED_MAGIC, COMPILED_VERSION, _BYTEORDER,
+                          signature[0], signature[1], len(store.words),
+                          store.sense_count, len(store.strings), len(store.variants),
+                          len(store.answer_keys))
+    path = compiled_path(dict_key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            f.write(offsets.tobytes())
+            for table in _store_tables(store):
+                f.write(array('I', table).tobytes())
+            f.write(blob)
+        # Reemplazo atómico: los workers que ya tienen mapeado el archivo
+        # anterior siguen leyendo su inodo hasta que lo sueltan.
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    _LOAD_SECONDS.labels(dict_key, 'write').observe(time.perf_counter() - started)
+    return path
+
+def load_compiled(dict_key, signature):
+    """
+    Mapea en memoria el binario de una lección si existe y está al día.
+
+    Las páginas se mapean en solo lectura, de modo que todos los workers que
+    abren el mismo archivo comparten la memoria física a través de la caché
+    de páginas del sistema. Devuelve None si falta, es de otra versión o no
+    corresponde a la firma actual del XML, para que el llamador recurra al
+    análisis del XML.
+    """
+    try:
+        with open(compiled_path(dict_key), 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    store = _map_store(mm, signature)
+    if store is None:
+        # Las vistas del intento se liberan al volver de _map_store; sin
+        # cerrarlo, el mapa seguiría abierto hasta la recolección de basura
+        mm.close()
+    return store
+
+def _map_store(mm, signature):
+    """EntryStore sobre el binario mapeado mm, o None si no es válido para signature."""
+    if len(mm) < _HEADER.size:
+        return None
+    (magic, version, byteorder, mtime_ns, size,
+     n_words, n_senses, n_strings, n_variants, n_answers) = _HEADER.unpack_from(mm, 0)
+    if (magic != COMPILED_MAGIC or version != COMPILED_VERSION
+            or byteorder != _BYTEORDER or (mtime_ns, size) != signature):
+        return None
+
+    view = memoryview(mm)
+    pos = _HEADER.size
+    tables = []
+    for length in (n_strings + 1, n_words + 1, n_senses, n_senses, n_senses + 1, n_variants,
+                   n_words, n_words, n_answers, n_answers):
+        chunk = view[pos:pos + 4 * length]
+        # Un archivo truncado deja tablas incompletas
+        if len(chunk) != 4 * length:
+            return None
+        tables.append(chunk.cast('I'))
+        pos += 4 * length
+    offsets = tables[0]
+    if pos + offsets[n_strings] != len(mm):
+        return None
+    blob = view[pos:]
+    return EntryStore(_MappedStrings(offsets, blob, n_strings),
+                      _MappedStrings(offsets, blob, n_words),
+                      *tables[1:], buffer=mm)
+
+
+class _MappedStrings(Sequence):
+    """Secuencia de solo lectura sobre la tabla de cadenas del binario."""
+
+    __slots__ = ('_offsets', '_blob', '_length')
+
+    def __init__(self, offsets, blob, length):
+        self._offsets = offsets
+        self._blob = blob
+        self._length = length
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        return str(self._blob[self._offsets[index]:self._offsets[index + 1]], 'utf-8')
+
+    def __len__(self):
+        return self._length
+
+
+def _file_signature(path):
+    """Devuelve (mtime, tamaño) del archivo, o None si no se puede leer."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def _load_store(dict_key, signature):
+    """EntryStore de una lección: el binario precompilado si está al día o, si no, el XML."""
+    if signature is not None:
+        started = time.perf_counter()
+        store = load_compiled(dict_key, signature)
+        if store is not None:
+            _LOAD_SECONDS.labels(dict_key, 'mmap').observe(time.perf_counter() - started)
+            _LOADS.labels(dict_key, 'compiled').inc()
+            return store
+    store = _parse_lesson_xml(available_lessons[dict_key]['file'], dict_key)
+    _LOADS.labels(dict_key, 'xml').inc()
+    return store
+
+def _build_dictionary(dict_key, base):
+    """
+    (firma, diccionario) de una lección.
+
+    Las lecciones se construyen como vistas sobre base. Si el XML no se
+    puede leer (p. ej. está a medio escribir) se mantiene la versión
+    anterior, que se volverá a intentar en la siguiente comprobación.
+    """
+    signature = _file_signature(available_lessons[dict_key]['file'])
+    try:
+        store = _load_store(dict_key, signature)
+    except Exception:
+        previous = _dictionaries.get(dict_key)
+        if previous is not None:
+            _LOADS.labels(dict_key, 'previous').inc()
+            return previous
+        store = load_dictionary(dict_key)
+        _LOADS.labels(dict_key, 'fallback').inc()
+    if base is None:
+        dictionary = store
+    else:
+        started = time.perf_counter()
+        dictionary = build_view(base, store)
+        _LOAD_SECONDS.labels(dict_key, 'view').observe(time.perf_counter() - started)
+    return signature, dictionary
+
+def refresh_lessons():
+    """
+    Sincroniza los diccionarios cargados con los XML en disco.
+
+    Descubre las lecciones nuevas o borradas y reconstruye sólo las que han
+    cambiado, o todas si cambia el diccionario principal (las vistas apuntan
+    a sus entradas). Las peticiones siguen usando la versión anterior hasta
+    que la nueva está lista. Devuelve las claves reconstruidas o eliminadas.
+    """
+    global _dictionaries
+    with _refresh_lock:
+        discover_lessons()
+        current = _dictionaries
+        main = current.get(MAIN_DICTIONARY)
+        if main is None or main[0] != _file_signature(available_lessons[MAIN_DICTIONARY]['file']):
+            main = _build_dictionary(MAIN_DICTIONARY, None)
+            rebuilt = {MAIN_DICTIONARY: main}
+            for dict_key in available_lessons:
+                if dict_key != MAIN_DICTIONARY:
+                    rebuilt[dict_key] = _build_dictionary(dict_key, main[1])
+            _dictionaries = rebuilt
+            return list(rebuilt)
+        changed = []
+        for dict_key in list(current):
+            if dict_key not in available_lessons:
+                del current[dict_key]
+                changed.append(dict_key)
+        for dict_key, lesson in available_lessons.items():
+            entry = current.get(dict_key)
+            if entry is None or entry[0] != _file_signature(lesson['file']):
+                current[dict_key] = _build_dictionary(dict_key, main[1])
+                changed.append(dict_key)
+        return changed
+
+def _is_current(dict_key, entry):
+    """Comprueba las firmas de la lección y del principal (sólo sin vigilante)."""
+    main = _dictionaries.get(MAIN_DICTIONARY)
+    return (main is not None
+            and entry[0] == _file_signature(available_lessons[dict_key]['file'])
+            and main[0] == _file_signature(available_lessons[MAIN_DICTIONARY]['file']))
+
+def get_dictionary(dict_key=None):
+    """
+    Devuelve el diccionario de una lección: el EntryStore del principal o
+    una LessonView sobre él.
+
+    Con el vigilante de lecciones en marcha es una consulta a un dict; sin
+    él, cada llamada comprueba el mtime y el tamaño de los XML y llama a
+    refresh_lessons si han cambiado.
+    """
+    if dict_key is None:
+        dict_key = MAIN_DICTIONARY
+    if dict_key not in available_lessons:
+        return EMPTY_STORE
+    entry = _dictionaries.get(dict_key)
+    if entry is not None and (_lesson_watcher_alive() or _is_current(dict_key, entry)):
+        _LOOKUP_HIT.inc()
+        return entry[1]
+    _LOOKUP_MISS.inc()
+    refresh_lessons()
+    entry = _dictionaries.get(dict_key)
+    return entry[1] if entry is not None else EMPTY_STORE
+
+
+def memory_usage(dictionary):
+    """
+    Memoria aproximada de un diccionario: (bytes en el heap, bytes mapeados).
+
+    Cuenta los arrays (también los de los índices) y las cadenas; de una
+    LessonView sólo cuenta lo propio (ids y entradas de la lección), no el
+    diccionario principal al que apunta.
+    """
+    if isinstance(dictionary, LessonView):
+        heap, mapped = memory_usage(dictionary.extra)
+        return heap + sys.getsizeof(dictionary.ids), mapped
+    heap = mapped = 0
+    if dictionary._buffer is not None:
+        mapped = len(dictionary._buffer)
+    else:
+        for table in _store_tables(dictionary):
+            heap += sys.getsizeof(table)
+        heap += sys.getsizeof(dictionary.strings) + sys.getsizeof(dictionary.words)
+        for text in dictionary.strings:
+            heap += sys.getsizeof(text)
+    return heap, mapped
+
+# Memoria de cada diccionario cargado: clave -> (diccionario, (heap, mapeado)).
+# Se calcula una vez por versión del diccionario, al pedirla /metrics.
+_memory_usage_cache = {}
+
+def dictionary_info():
+    """Palabras, acepciones y memoria de cada diccionario cargado (para /metrics)."""
+    info = {}
+    for dict_key, (_, dictionary) in list(_dictionaries.items()):
+        cached = _memory_usage_cache.get(dict_key)
+        if cached is None or cached[0] is not dictionary:
+            cached = _memory_usage_cache[dict_key] = (dictionary, memory_usage(dictionary))
+        heap, mapped = cached[1]
+        shared = None
+        if isinstance(dictionary, LessonView):
+            base_len = len(dictionary.base.words)
+            shared = sum(1 for entry in dictionary.ids if entry < base_len)
+        info[dict_key] = {
+            'words': len(dictionary),
+            'senses': dictionary.sense_count,
+            'shared_words': shared,
+            'heap_bytes': heap,
+            'mapped_bytes': mapped,
+        }
+    for stale in _memory_usage_cache.keys() - info.keys():
+        _memory_usage_cache.pop(stale, None)
+    return info
+
+def _dictionary_gauge(field):
+    def collect():
+        return [((dict_key,), values[field]) for dict_key, values in dictionary_info().items()]
+    return collect
+
+metrics.REGISTRY.callback('dictionary_words', 'Palabras de cada diccionario cargado',
+                          ('lesson',), _dictionary_gauge('words'))
+metrics.REGISTRY.callback('dictionary_senses', 'Acepciones de cada diccionario cargado',
+                          ('lesson',), _dictionary_gauge('senses'))
+metrics.REGISTRY.callback('dictionary_shared_words',
+                          'Palabras de cada lección que apuntan al diccionario principal',
+                          ('lesson',), _dictionary_gauge('shared_words'))
+metrics.REGISTRY.callback(
+    'dictionary_memory_bytes', 'Memoria aproximada de cada diccionario cargado',
+    ('lesson', 'kind'),
+    lambda: [((dict_key, kind), values[f'{kind}_bytes'])
+             for dict_key, values in dictionary_info().items() for kind in ('heap', 'mapped')])
+
+
+def _lesson_watcher_alive():
+    if _watcher_interval and _watcher_pid != os.getpid():
+        # Los hilos no sobreviven a fork(): cada worker arranca el suyo
+        start_lesson_watcher(_watcher_interval)
+    return _watcher is not None and _watcher.is_alive()
+
+def _watch_lessons(interval, stop):
+    while not stop.wait(interval):
+        try:
+            refresh_lessons()
+        except Exception:
+            # Un error puntual (p. ej. de disco) no debe detener el vigilante
+            pass
+
+def start_lesson_watcher(interval=None):
+    """
+    Arranca el hilo que llama a refresh_lessons cada interval segundos
+    (LESSON_WATCH_INTERVAL por defecto; 0 no arranca nada).
+
+    Basta con llamarlo una vez antes de crear los workers: cada proceso
+    hijo arranca su propio hilo en su primera llamada a get_dictionary.
+    """
+    global _watcher, _watcher_stop, _watcher_pid, _watcher_interval
+    if interval is None:
+        interval = LESSON_WATCH_INTERVAL
+    with _refresh_lock:
+        if _watcher is not None and _watcher_pid == os.getpid():
+            _watcher_stop.set()
+        _watcher = _watcher_stop = None
+        _watcher_pid = os.getpid()
+        _watcher_interval = interval
+        if interval <= 0:
+            return None
+        _watcher_stop = threading.Event()
+        _watcher = threading.Thread(target=_watch_lessons, args=(interval, _watcher_stop),
+                                    name='lesson-watcher', daemon=True)
+        _watcher.start()
+    return _watcher
+
+def stop_lesson_watcher():
+    """Detiene el vigilante de lecciones de este proceso."""
+    start_lesson_watcher(0)
+
+def _reset_after_fork():
+    global _refresh_lock
+    # El vigilante del padre pudo quedarse con el lock en mitad de una
+    # recarga; en el hijo ese hilo ya no existe
+    _refresh_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Herramientas de diccionarios de lecciones.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    compile_parser = subparsers.add_parser(
+        'compile', help="Precompila los XML de lecciones al formato binario mapeable.")
+    compile_parser.add_argument('lessons', nargs='*',
+                                help="Claves de lección (p. ej. 1.xml); por defecto, todas.")
+    compile_parser.add_argument('--force', action='store_true',
+                                help="Recompila aunque el binario esté al día.")
+    stats_parser = subparsers.add_parser(
+        'stats', help="Analiza los XML y muestra entradas/s y pico de memoria.")
+    stats_parser.add_argument('lessons', nargs='*',
+                              help="Claves de lección (p. ej. 1.xml); por defecto, todas.")
+    stats_parser.add_argument('--trace-memory', action='store_true',
+                              help="Mide también el pico de asignaciones con tracemalloc (más lento).")
+    args = parser.parse_args(argv)
+
+    discover_lessons()
+    if args.command == 'compile':
+        written = compile_lessons(args.lessons or None, force=args.force)
+        for path in written:
+            print(f"Compilado: {path}")
+        if not written:
+            print("Todos los binarios están al día.")
+    elif args.command == 'stats':
+        for dict_key in args.lessons or list(available_lessons):
+            _parse_lesson_xml(available_lessons[dict_key]['file'], dict_key,
+                              trace_memory=args.trace_memory)
+            stats = load_stats[dict_key]
+            line = (f"{dict_key}: {stats['words']} palabras, "
+                    f"{stats['entries']} entradas en {stats['seconds']:.3f} s "
+                    f"({stats['entries_per_second']:.0f} entradas/s), "
+                    f"pico RSS {stats['peak_rss_kb']} KB")
+            if stats['peak_alloc_bytes'] is not None:
+                line += f", pico asignado {stats['peak_alloc_bytes'] / 1024:.0f} KB"
+            print(line)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
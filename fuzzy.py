@@ -0,0 +1,119 @@
+"""
+Búsqueda tolerante a errores de escritura sobre las respuestas de una palabra.
+
+Las respuestas aceptadas de cada palabra (EntryStore.answer_set) se guardan en
+un trie y se recorren calculando la distancia de edición fila a fila, de modo
+que los prefijos comunes ("run", "run (move quickly)", "to run"...) se
+evalúan una sola vez y las ramas que ya superan el umbral se podan. La
+distancia es la de Damerau-Levenshtein restringida (OSA): intercambiar dos
+letras contiguas ("recieve" -> "receive") cuenta como un solo error.
+"""
+import functools
+import time
+
+import metrics
+
+# Número de nodos visitados entre comprobaciones del presupuesto de tiempo
+_BUDGET_CHECK_INTERVAL = 64
+
+
+class AnswerTrie:
+    """Trie inmutable de respuestas normalizadas, en orden alfabético."""
+
+    __slots__ = ('root',)
+
+    # Clave de los nodos terminales; ningún carácter puede ser None
+    _END = None
+
+    def __init__(self, answers):
+        self.root = {}
+        for answer in sorted(answers):
+            node = self.root
+            for char in answer:
+                node = node.setdefault(char, {})
+            node[self._END] = answer
+
+    def closest(self, text, max_distance, deadline=None):
+        """
+        Respuesta más cercana a text con distancia <= max_distance.
+
+        Devuelve (respuesta, distancia) o None; a igual distancia gana la
+        primera en orden alfabético. Si se alcanza deadline (un instante de
+        time.perf_counter) se devuelve lo mejor encontrado hasta ese momento.
+        """
+        width = len(text) + 1
+        # Las celdas a más de max_distance de la diagonal nunca pueden quedar
+        # dentro del umbral (banda de Ukkonen): se rellenan con un valor
+        # mayor y sólo se calcula la banda.
+        out_of_band = max_distance + 1
+        first_row = [j if j <= max_distance else out_of_band for j in range(width)]
+        best_answer = None
+        limit = max_distance
+        visited = 0
+        # (nodo, profundidad, carácter que lleva a él, fila anterior,
+        #  fila previa a la anterior, carácter anterior). Los hijos se apilan
+        # al revés para recorrer el trie en orden alfabético.
+        stack = [(child, 1, char, first_row, None, None)
+                 for char, child in reversed(self.root.items()) if char is not self._END]
+        while stack:
+            node, depth, char, prev_row, prev_prev_row, prev_char = stack.pop()
+            visited += 1
+            if deadline is not None and visited % _BUDGET_CHECK_INTERVAL == 0 \
+                    and time.perf_counter() > deadline:
+                break
+            row = [out_of_band] * width
+            if depth <= max_distance:
+                row[0] = depth
+            for j in range(max(1, depth - max_distance), min(width, depth + max_distance + 1)):
+                text_char = text[j - 1]
+                cost = prev_row[j - 1] + (text_char != char)
+                insert = row[j - 1] + 1
+                if insert < cost:
+                    cost = insert
+                delete = prev_row[j] + 1
+                if delete < cost:
+                    cost = delete
+                if (prev_prev_row is not None and j > 1 and text_char == prev_char
+                        and text[j - 2] == char):
+                    transpose = prev_prev_row[j - 2] + 1
+                    if transpose < cost:
+                        cost = transpose
+                row[j] = cost
+            if self._END in node and row[-1] <= limit:
+                if best_answer is None or row[-1] < limit:
+                    best_answer = node[self._END]
+                    limit = row[-1]
+                    if limit == 0:
+                        break
+            # El mínimo de la fila nunca decrece al bajar por el trie
+            if min(row) > limit:
+                continue
+            for next_char, child in reversed(node.items()):
+                if next_char is not self._END:
+                    stack.append((child, depth + 1, next_char, row, prev_row, char))
+        if best_answer is None:
+            return None
+        return best_answer, limit
+
+
+@functools.lru_cache(maxsize=4096)
+def answer_trie(answers):
+    """Trie de un frozenset de respuestas, reutilizado entre peticiones."""
+    return AnswerTrie(answers)
+
+metrics.register_lru_cache('answer_trie', answer_trie)
+
+def closest_answer(answers, text, max_distance=2, budget_ms=1.0, min_chars_per_edit=4):
+    """
+    Respuesta de answers más cercana al texto normalizado text.
+
+    El umbral efectivo es min(max_distance, len(text) // min_chars_per_edit),
+    para que las respuestas cortas no acepten cualquier cosa. Devuelve
+    (respuesta, distancia) o None si ninguna respuesta queda dentro del
+    umbral o se agota budget_ms.
+    """
+    allowed = min(max_distance, len(text) // min_chars_per_edit)
+    if allowed <= 0 or not answers:
+        return None
+    deadline = time.perf_counter() + budget_ms / 1000.0 if budget_ms else None
+    return answer_trie(answers).closest(text, allowed, deadline)
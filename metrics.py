@@ -0,0 +1,319 @@
+"""
+Métricas internas de la aplicación en formato de texto de Prometheus.
+
+Contadores e histogramas en memoria del proceso, pensados para dejarlos
+activos en producción: registrar un valor es una búsqueda por bisección y
+una suma bajo un lock. Las métricas que describen el estado (palabras y
+memoria de cada diccionario, cachés lru_cache, memoria del proceso) se
+calculan al pedir /metrics mediante funciones registradas.
+
+Con Gunicorn cada worker tiene sus propias métricas; Prometheus las
+distingue por la instancia a la que consulta.
+
+También incluye SampledProfiler, que perfila con cProfile una fracción de
+las peticiones y acumula el resultado por ruta.
+"""
+import bisect
+import cProfile
+import io
+import os
+import pstats
+import random
+import sys
+import threading
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Límites superiores (segundos) de los histogramas de latencia
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class _CounterValue:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class _HistogramValue:
+    __slots__ = ('buckets', 'counts', 'sum', '_lock')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # counts[i] cuenta las observaciones de (buckets[i - 1], buckets[i]];
+        # la última posición, las mayores que todos los límites
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # Series por valores de etiqueta ya convertidos a str, y un atajo
+        # desde los valores tal y como se pasan (p. ej. un código de estado int)
+        self._children = {}
+        self._aliases = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Serie de la métrica para esos valores de etiqueta (se crea la primera vez)."""
+        child = self._aliases.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} espera las etiquetas {self.labelnames}")
+            key = tuple(str(value) for value in values)
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+                self._aliases[values] = child
+        return child
+
+    def render(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} {self.kind}'
+        yield from self._render_samples()
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterValue()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def _render_samples(self):
+        for values, child in sorted(self._children.items()):
+            yield f'{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}'
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def _render_samples(self):
+        for values, child in sorted(self._children.items()):
+            with child._lock:
+                counts = list(child.counts)
+                total = child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, values, (('le', _format_value(float(bound))),))
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = _format_labels(self.labelnames, values)
+            yield f'{self.name}_sum{labels} {_format_value(total)}'
+            yield f'{self.name}_count{labels} {cumulative}'
+
+
+class CallbackMetric(_Metric):
+    """Métrica cuyos valores se calculan al exportar: function() -> [(valores de etiqueta, valor)]."""
+
+    def __init__(self, name, documentation, labelnames, function, kind='gauge'):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+        self.kind = kind
+
+    def _render_samples(self):
+        for values, value in sorted(self.function()):
+            if value is not None:
+                yield f'{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}'
+
+
+class Registry:
+    """Conjunto de métricas que se exportan juntas."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Métrica duplicada: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name, documentation, labelnames, function, kind='gauge'):
+        return self.register(CallbackMetric(name, documentation, labelnames, function, kind))
+
+    def render(self):
+        """Todas las métricas en formato de texto de Prometheus."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                rendered = list(metric.render())
+            except Exception as e:
+                # Una función de métrica que falla no debe tumbar la exportación
+                lines.append(f'# {metric.name}: error {type(e).__name__}')
+                continue
+            lines.extend(rendered)
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+# --- Cachés lru_cache y memoria del proceso ------------------------------
+
+_lru_caches = {}
+
+def register_lru_cache(name, function):
+    """Exporta los aciertos, fallos y tamaño de una función decorada con functools.lru_cache."""
+    _lru_caches[name] = function
+
+def _lru_cache_field(field):
+    def collect():
+        return [((name,), getattr(function.cache_info(), field))
+                for name, function in list(_lru_caches.items())]
+    return collect
+
+REGISTRY.callback('lru_cache_hits_total', 'Aciertos de las cachés lru_cache',
+                  ('cache',), _lru_cache_field('hits'), kind='counter')
+REGISTRY.callback('lru_cache_misses_total', 'Fallos de las cachés lru_cache',
+                  ('cache',), _lru_cache_field('misses'), kind='counter')
+REGISTRY.callback('lru_cache_entries', 'Entradas guardadas en las cachés lru_cache',
+                  ('cache',), _lru_cache_field('currsize'))
+
+def _resident_memory():
+    try:
+        with open('/proc/self/statm') as f:
+            return [((), int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE'))]
+    except (OSError, ValueError, IndexError):
+        return []
+
+def _peak_resident_memory():
+    if resource is None:
+        return []
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS informa en bytes; Linux y el resto, en KB
+    return [((), peak if sys.platform == 'darwin' else peak * 1024)]
+
+REGISTRY.callback('process_resident_memory_bytes', 'Memoria residente del proceso',
+                  (), _resident_memory)
+REGISTRY.callback('process_peak_resident_memory_bytes', 'Pico de memoria residente del proceso',
+                  (), _peak_resident_memory)
+
+
+# --- Perfilado por muestreo ----------------------------------------------
+
+class SampledProfiler:
+    """
+    Perfila con cProfile una fracción sample_rate de las peticiones.
+
+    Sólo se perfila una petición a la vez por proceso (cProfile no admite
+    perfiles simultáneos); las que coinciden con otra se atienden sin
+    perfilar. Las estadísticas se acumulan por ruta con pstats.
+    """
+
+    def __init__(self, sample_rate, rng=random.random):
+        self.sample_rate = sample_rate
+        self.rng = rng
+        self._active = threading.Lock()
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._samples = {}
+
+    def start(self):
+        """Devuelve un perfil ya activo si esta petición entra en la muestra, o None."""
+        if self.sample_rate <= 0 or self.rng() >= self.sample_rate:
+            return None
+        if not self._active.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Hay otro perfilador activo en el proceso
+            self._active.release()
+            return None
+        return profile
+
+    def stop(self, profile, route):
+        """Detiene el perfil devuelto por start y lo suma a los de la ruta."""
+        profile.disable()
+        self._active.release()
+        with self._lock:
+            stats = self._stats.get(route)
+            if stats is None:
+                self._stats[route] = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+            self._samples[route] = self._samples.get(route, 0) + 1
+
+    def report(self, route=None, sort='cumulative', limit=40):
+        """Resumen en texto de las funciones más costosas, de una ruta o de todas."""
+        out = io.StringIO()
+        with self._lock:
+            routes = [route] if route is not None else sorted(self._stats)
+            for name in routes:
+                stats = self._stats.get(name)
+                if stats is None:
+                    continue
+                out.write(f"=== {name} ({self._samples[name]} peticiones) ===\n")
+                stats.stream = out
+                stats.sort_stats(sort).print_stats(limit)
+        return out.getvalue() or "Sin muestras todavía.\n"
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._samples.clear()
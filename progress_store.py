@@ -0,0 +1,369 @@
+"""
+Progreso de los alumnos guardado en SQLite.
+
+La cookie de sesión sólo lleva el identificador del alumno; su estado
+(lección, palabra actual, si ha pedido ayuda), el registro de intentos y los
+agregados por lección viven aquí.
+
+- La base de datos usa WAL con synchronous=NORMAL: las confirmaciones no
+  esperan a fsync y los lectores no bloquean al escritor.
+- Los intentos y las peticiones de ayuda se encolan y un hilo en segundo
+  plano los escribe por lotes en una sola transacción (write-behind), así
+  que la latencia de /check y /help no depende del disco. Las estadísticas
+  pueden ir hasta FLUSH_INTERVAL segundos por detrás.
+- El estado del alumno se escribe en el momento, porque la siguiente
+  petición (quizá en otro worker) tiene que leerlo.
+- DeckBackend guarda ahí también los mazos del planificador de repaso
+  (ver scheduler.py), una fila por palabra, para que sobrevivan a los
+  reinicios y todos los workers vean el mismo.
+"""
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from scheduler import ReviewDeck
+
+logger = logging.getLogger(__name__)
+
+# Máximo de eventos por transacción y espera máxima antes de escribirlos
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 1.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS learners (
+    learner_id   TEXT PRIMARY KEY,
+    lesson_key   TEXT,
+    current_word TEXT,
+    help_shown   INTEGER NOT NULL DEFAULT 0,
+    updated_at   REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS attempts (
+    id          INTEGER PRIMARY KEY,
+    learner_id  TEXT NOT NULL,
+    lesson_key  TEXT NOT NULL,
+    word        TEXT NOT NULL,
+    kind        TEXT NOT NULL,          -- 'check' o 'help'
+    correct     INTEGER,                -- NULL en las peticiones de ayuda
+    help_used   INTEGER NOT NULL DEFAULT 0,
+    created_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS attempts_learner ON attempts (learner_id, lesson_key, created_at);
+CREATE TABLE IF NOT EXISTS lesson_stats (
+    learner_id  TEXT NOT NULL,
+    lesson_key  TEXT NOT NULL,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    correct     INTEGER NOT NULL DEFAULT 0,
+    helps       INTEGER NOT NULL DEFAULT 0,
+    last_seen   REAL NOT NULL,
+    PRIMARY KEY (learner_id, lesson_key)
+);
+CREATE TABLE IF NOT EXISTS review_decks (
+    learner_id  TEXT NOT NULL,
+    lesson_key  TEXT NOT NULL,
+    version     INTEGER NOT NULL,       -- sube en cada escritura del mazo
+    PRIMARY KEY (learner_id, lesson_key)
+);
+CREATE TABLE IF NOT EXISTS review_words (
+    learner_id  TEXT NOT NULL,
+    lesson_key  TEXT NOT NULL,
+    word        TEXT NOT NULL,
+    interval    REAL NOT NULL,
+    ease        REAL NOT NULL,
+    due         REAL NOT NULL,
+    reps        INTEGER NOT NULL,
+    version     INTEGER NOT NULL,       -- versión del mazo que la escribió
+    PRIMARY KEY (learner_id, lesson_key, word)
+);
+"""
+
+_INSERT_ATTEMPT = """
+INSERT INTO attempts (learner_id, lesson_key, word, kind, correct, help_used, created_at)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+_UPSERT_STATS = """
+INSERT INTO lesson_stats (learner_id, lesson_key, attempts, correct, helps, last_seen)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (learner_id, lesson_key) DO UPDATE SET
+    attempts = attempts + excluded.attempts,
+    correct = correct + excluded.correct,
+    helps = helps + excluded.helps,
+    last_seen = max(last_seen, excluded.last_seen)
+"""
+
+
+class ProgressStore:
+    """Almacén de progreso; una instancia por proceso, segura entre hilos."""
+
+    def __init__(self, path, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._queue = queue.Queue()
+        self._writer = None
+        self._writer_pid = None
+        self._writer_lock = threading.Lock()
+        conn = self._connect()
+        try:
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+        atexit.register(self.flush)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _conn(self):
+        """Conexión del hilo actual (sqlite3 no comparte conexiones entre hilos ni procesos)."""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.conn = self._connect()
+            local.pid = os.getpid()
+        return local.conn
+
+    # --- Estado del alumno (escritura inmediata) --------------------------
+
+    def get_state(self, learner_id):
+        row = self._conn().execute(
+            'SELECT lesson_key, current_word, help_shown FROM learners WHERE learner_id = ?',
+            (learner_id,)).fetchone()
+        if row is None:
+            return {'lesson_key': None, 'current_word': None, 'help_shown': False}
+        return {'lesson_key': row[0], 'current_word': row[1], 'help_shown': bool(row[2])}
+
+    def save_state(self, learner_id, state):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                'INSERT INTO learners (learner_id, lesson_key, current_word, help_shown, updated_at) '
+                'VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (learner_id) DO UPDATE SET lesson_key = excluded.lesson_key, '
+                'current_word = excluded.current_word, help_shown = excluded.help_shown, '
+                'updated_at = excluded.updated_at',
+                (learner_id, state['lesson_key'], state['current_word'],
+                 int(state['help_shown']), time.time()))
+
+    # --- Intentos (write-behind) ------------------------------------------
+
+    def record_attempt(self, learner_id, lesson_key, word, correct, help_used=False):
+        _check_event(learner_id, lesson_key, word)
+        self._enqueue((learner_id, lesson_key, word, 'check', int(bool(correct)),
+                       int(bool(help_used)), time.time()))
+
+    def record_help(self, learner_id, lesson_key, word):
+        _check_event(learner_id, lesson_key, word)
+        self._enqueue((learner_id, lesson_key, word, 'help', None, 1, time.time()))
+
+    def _enqueue(self, event):
+        self._ensure_writer()
+        self._queue.put(event)
+
+    def _ensure_writer(self):
+        # Los hilos no sobreviven a fork(): cada worker arranca el suyo
+        if self._writer_pid == os.getpid() and self._writer.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer_pid != os.getpid() or not self._writer.is_alive():
+                if self._writer_pid != os.getpid():
+                    self._queue = queue.Queue()
+                self._writer = threading.Thread(target=self._write_loop,
+                                                name='progress-writer', daemon=True)
+                self._writer_pid = os.getpid()
+                self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                self._write_events(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_events(self, batch):
+        """Escribe el lote; si falla, lo reintenta evento a evento y sólo descarta los que fallan."""
+        try:
+            self._write_batch(batch)
+            return
+        except sqlite3.Error:
+            if len(batch) == 1:
+                logger.exception("Evento de progreso descartado: %r", batch[0])
+                return
+            logger.warning("No se pudo escribir un lote de %d eventos de progreso; "
+                           "se reintenta uno a uno", len(batch), exc_info=True)
+        for event in batch:
+            try:
+                self._write_batch([event])
+            except sqlite3.Error:
+                logger.exception("Evento de progreso descartado: %r", event)
+
+    def _write_batch(self, batch):
+        totals = {}
+        for learner_id, lesson_key, word, kind, correct, help_used, created_at in batch:
+            key = (learner_id, lesson_key)
+            attempts, correct_count, helps, last_seen = totals.get(key, (0, 0, 0, 0.0))
+            if kind == 'check':
+                attempts += 1
+                correct_count += correct
+            else:
+                helps += 1
+            totals[key] = (attempts, correct_count, helps, max(last_seen, created_at))
+        conn = self._conn()
+        with conn:
+            conn.executemany(_INSERT_ATTEMPT, batch)
+            conn.executemany(_UPSERT_STATS, [key + value for key, value in totals.items()])
+
+    def flush(self):
+        """Espera a que se escriban todos los eventos encolados por este proceso."""
+        if self._writer_pid == os.getpid() and self._writer.is_alive():
+            self._queue.join()
+
+    # --- Lectura ------------------------------------------------------------
+
+    def lesson_stats(self, learner_id):
+        """Intentos, aciertos, ayudas y porcentaje de acierto por lección."""
+        rows = self._conn().execute(
+            'SELECT lesson_key, attempts, correct, helps, last_seen FROM lesson_stats '
+            'WHERE learner_id = ? ORDER BY last_seen DESC', (learner_id,)).fetchall()
+        return [{
+            'lesson_key': lesson_key,
+            'attempts': attempts,
+            'correct': correct,
+            'helps': helps,
+            'accuracy': correct / attempts if attempts else None,
+            'last_seen': last_seen,
+        } for lesson_key, attempts, correct, helps, last_seen in rows]
+
+    def recent_attempts(self, learner_id, lesson_key=None, limit=50):
+        """Últimos intentos del alumno, del más reciente al más antiguo."""
+        query = ('SELECT lesson_key, word, kind, correct, help_used, created_at '
+                 'FROM attempts WHERE learner_id = ?')
+        params = [learner_id]
+        if lesson_key is not None:
+            query += ' AND lesson_key = ?'
+            params.append(lesson_key)
+        query += ' ORDER BY created_at DESC LIMIT ?'
+        params.append(limit)
+        return [{
+            'lesson_key': row[0],
+            'word': row[1],
+            'kind': row[2],
+            'correct': None if row[3] is None else bool(row[3]),
+            'help_used': bool(row[4]),
+            'created_at': row[5],
+        } for row in self._conn().execute(query, params)]
+
+
+def _check_event(learner_id, lesson_key, word):
+    # Un evento incompleto haría fallar la transacción de todo su lote
+    for name, value in (('learner_id', learner_id), ('lesson_key', lesson_key), ('word', word)):
+        if not isinstance(value, str) or not value:
+            raise ValueError(f"{name} no válido: {value!r}")
+
+
+class DeckBackend:
+    """
+    Backend del Scheduler que guarda los mazos en SQLite, una fila por palabra.
+
+    Cada escritura sólo toca las palabras que han cambiado y sube la versión
+    del mazo en review_decks; cada fila lleva la versión que la escribió.
+    Cada worker conserva en memoria los últimos mazos que ha usado junto con
+    su versión, así que al cargar sólo lee las filas escritas por otros
+    workers desde entonces. Las escrituras son inmediatas, como las del
+    estado del alumno.
+    """
+
+    _SELECT_VERSION = 'SELECT version FROM review_decks WHERE learner_id = ? AND lesson_key = ?'
+    _SELECT_WORDS = ('SELECT word, interval, ease, due, reps FROM review_words '
+                     'WHERE learner_id = ? AND lesson_key = ? AND version > ?')
+    _BUMP_VERSION = ('INSERT INTO review_decks (learner_id, lesson_key, version) VALUES (?, ?, 1) '
+                     'ON CONFLICT (learner_id, lesson_key) DO UPDATE SET version = version + 1')
+    _UPSERT_WORD = ('INSERT INTO review_words '
+                    '(learner_id, lesson_key, word, interval, ease, due, reps, version) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT (learner_id, lesson_key, word) DO UPDATE SET '
+                    'interval = excluded.interval, ease = excluded.ease, due = excluded.due, '
+                    'reps = excluded.reps, version = excluded.version')
+
+    def __init__(self, store, max_decks=10000):
+        self.store = store
+        self.max_decks = max_decks
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, key):
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+            return cached
+
+    def _remember(self, key, version, deck):
+        with self._lock:
+            self._cache[key] = (version, deck)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_decks:
+                self._cache.popitem(last=False)
+
+    def _forget(self, key):
+        with self._lock:
+            self._cache.pop(key, None)
+
+    def load(self, learner_id, lesson_key):
+        key = (learner_id, lesson_key)
+        conn = self.store._conn()
+        row = conn.execute(self._SELECT_VERSION, key).fetchone()
+        if row is None:
+            return None
+        version = row[0]
+        cached = self._cached(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        if cached is not None and cached[0] < version:
+            deck, since = cached[1], cached[0]
+        else:
+            deck, since = ReviewDeck(), 0
+        for word, interval, ease, due, reps in conn.execute(self._SELECT_WORDS, key + (since,)):
+            deck.restore(word, interval, ease, due, reps)
+        self._remember(key, version, deck)
+        return deck
+
+    def save(self, learner_id, lesson_key, deck):
+        key = (learner_id, lesson_key)
+        cached = self._cached(key)
+        changes = deck.take_changes()
+        conn = self.store._conn()
+        try:
+            with conn:
+                conn.execute(self._BUMP_VERSION, key)
+                (version,) = conn.execute(self._SELECT_VERSION, key).fetchone()
+                conn.executemany(self._UPSERT_WORD,
+                                 [key + change + (version,) for change in changes])
+        except sqlite3.Error:
+            # El mazo en memoria ya no coincide con el guardado
+            self._forget(key)
+            raise
+        previous = 0 if cached is None else cached[0] if cached[1] is deck else None
+        if previous is not None and version == previous + 1:
+            self._remember(key, version, deck)
+        else:
+            # Otro worker ha escrito entre medias: la próxima carga lee el mazo entero
+            self._forget(key)
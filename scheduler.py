@@ -0,0 +1,270 @@
+"""
+Planificador de repaso espaciado de palabras por alumno y lección.
+
+Cada alumno tiene, para cada lección, un ReviewDeck con el estado de las
+palabras que ya ha practicado (intervalo, facilidad y próxima fecha de
+repaso, al estilo SM-2) y un montículo ordenado por fecha de repaso. La
+siguiente palabra es la primera pendiente del montículo (O(log n)) o, si no
+hay ninguna, una palabra nueva elegida al azar del array de palabras de la
+lección (O(1)), de modo que el coste no depende del tamaño del diccionario.
+
+El estado se guarda a través de un backend intercambiable (MemoryBackend
+por defecto) que sólo necesita load(learner_id, lesson_key) y
+save(learner_id, lesson_key, deck). save sólo se llama si el mazo ha
+cambiado y puede escribir únicamente las palabras modificadas
+(ReviewDeck.take_changes). La aplicación usa DeckBackend (ver
+progress_store.py), que las guarda en SQLite, una fila por palabra.
+"""
+import heapq
+import random
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+# Calificaciones de un intento (escala SM-2 de 0 a 5)
+AGAIN = 1   # respuesta incorrecta
+HARD = 3    # correcta, pero después de pedir ayuda
+GOOD = 4    # correcta a la primera
+
+# Intervalos de aprendizaje, en segundos
+RELEARN_INTERVAL = 60
+FIRST_INTERVAL = 10 * 60
+SECOND_INTERVAL = 24 * 60 * 60
+# Una palabra elegida pero nunca contestada vuelve a salir pasado este tiempo
+LEASE_SECONDS = 5 * 60
+
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+
+# Intentos de elegir una palabra nueva al azar antes de dar el mazo por saturado
+_NEW_WORD_ATTEMPTS = 8
+
+# Locks entre los que se reparten los mazos (ver Scheduler)
+_LOCK_STRIPES = 64
+
+
+class ReviewDeck:
+    """
+    Estado de repaso de un alumno en una lección.
+
+    Las palabras vistas ocupan una posición ("slot") en arrays paralelos;
+    el montículo guarda (fecha de repaso, slot) y las entradas cuya fecha ya
+    no coincide con due[slot] se descartan al sacarlas (borrado perezoso).
+    dirty reúne los slots modificados desde el último take_changes.
+    """
+
+    __slots__ = ('words', 'slots', 'interval', 'ease', 'due', 'reps', 'dirty', '_heap')
+
+    def __init__(self):
+        self.words = []
+        self.slots = {}
+        self.interval = array('f')
+        self.ease = array('f')
+        self.due = array('d')
+        self.reps = array('H')
+        self.dirty = set()
+        self._heap = []
+
+    def __len__(self):
+        return len(self.words)
+
+    def _slot(self, word):
+        slot = self.slots.get(word)
+        if slot is None:
+            slot = self.slots[word] = len(self.words)
+            self.words.append(word)
+            self.interval.append(0.0)
+            self.ease.append(DEFAULT_EASE)
+            self.due.append(0.0)
+            self.reps.append(0)
+        return slot
+
+    def _schedule(self, slot, due):
+        self.dirty.add(slot)
+        self._push(slot, due)
+
+    def _push(self, slot, due):
+        self.due[slot] = due
+        heapq.heappush(self._heap, (due, slot))
+        # El borrado perezoso deja entradas obsoletas; se compacta al doblar el tamaño
+        if len(self._heap) > 2 * len(self.words) + 64:
+            self._heap = [(d, s) for s, d in enumerate(self.due)]
+            heapq.heapify(self._heap)
+
+    def _peek_due(self):
+        """(fecha, slot) de la primera palabra programada, o None."""
+        heap = self._heap
+        while heap:
+            due, slot = heap[0]
+            if self.due[slot] == due:
+                return due, slot
+            heapq.heappop(heap)
+        return None
+
+    def next_word(self, dictionary, now, rng=random):
+        """
+        Elige la siguiente palabra de dictionary (un EntryStore o similar).
+
+        Devuelve la primera palabra pendiente de repaso; si no hay, una
+        palabra nueva al azar; y si todas las probadas ya se han visto, la
+        que antes toque repasar. La palabra elegida se aplaza LEASE_SECONDS
+        por si no llega a contestarse.
+        """
+        words = dictionary.words
+        if not words:
+            return None
+        chosen = None
+        # Las palabras que ya no están en la lección (XML editado) se descartan
+        while True:
+            top = self._peek_due()
+            if top is None or top[0] > now:
+                break
+            word = self.words[top[1]]
+            if word in dictionary:
+                chosen = top[1]
+                break
+            heapq.heappop(self._heap)
+            self.due[top[1]] = float('inf')
+            self.dirty.add(top[1])
+        if chosen is None:
+            for _ in range(_NEW_WORD_ATTEMPTS):
+                word = words[rng.randrange(len(words))]
+                if word not in self.slots:
+                    return word
+            top = self._peek_due()
+            if top is None:
+                return words[rng.randrange(len(words))]
+            chosen = top[1]
+        self._schedule(chosen, now + LEASE_SECONDS)
+        return self.words[chosen]
+
+    def review(self, word, grade, now):
+        """Actualiza el estado de la palabra tras un intento calificado con grade."""
+        slot = self._slot(word)
+        ease = self.ease[slot]
+        if grade < HARD:
+            self.reps[slot] = 0
+            interval = RELEARN_INTERVAL
+        else:
+            reps = self.reps[slot]
+            if reps == 0:
+                interval = FIRST_INTERVAL
+            elif reps == 1:
+                interval = SECOND_INTERVAL
+            else:
+                interval = self.interval[slot] * ease
+            self.reps[slot] = min(reps + 1, 0xFFFF)
+        ease += 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02)
+        self.ease[slot] = max(MIN_EASE, ease)
+        self.interval[slot] = interval
+        self._schedule(slot, now + interval)
+
+    # --- Cambios para los backends persistentes --------------------------
+
+    def take_changes(self):
+        """(palabra, intervalo, facilidad, fecha, repeticiones) de los slots modificados, que dejan de estarlo."""
+        changes = [(self.words[slot], self.interval[slot], self.ease[slot], self.due[slot],
+                    self.reps[slot]) for slot in sorted(self.dirty)]
+        self.dirty.clear()
+        return changes
+
+    def restore(self, word, interval, ease, due, reps):
+        """Fija el estado guardado de una palabra (sin marcarla como modificada)."""
+        slot = self._slot(word)
+        self.interval[slot] = interval
+        self.ease[slot] = ease
+        self.reps[slot] = reps
+        self._push(slot, due)
+
+
+class MemoryBackend:
+    """Guarda los mazos en memoria del worker, descartando los menos usados."""
+
+    def __init__(self, max_decks=10000):
+        self.max_decks = max_decks
+        self._decks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, learner_id, lesson_key):
+        key = (learner_id, lesson_key)
+        with self._lock:
+            deck = self._decks.get(key)
+            if deck is not None:
+                self._decks.move_to_end(key)
+            return deck
+
+    def save(self, learner_id, lesson_key, deck):
+        deck.dirty.clear()
+        key = (learner_id, lesson_key)
+        with self._lock:
+            self._decks[key] = deck
+            self._decks.move_to_end(key)
+            while len(self._decks) > self.max_decks:
+                self._decks.popitem(last=False)
+
+
+class Scheduler:
+    """
+    Punto de entrada del planificador, seguro entre hilos.
+
+    Las operaciones sobre un mismo mazo se serializan con uno de
+    _LOCK_STRIPES locks, elegido por (alumno, lección), de modo que la E/S
+    del backend para un alumno no hace esperar a los demás.
+    """
+
+    def __init__(self, backend=None, clock=time.time, rng=None):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self._locks = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+
+    def _lock(self, learner_id, lesson_key):
+        return self._locks[hash((learner_id, lesson_key)) % _LOCK_STRIPES]
+
+    def _deck(self, learner_id, lesson_key):
+        deck = self.backend.load(learner_id, lesson_key)
+        if deck is None:
+            deck = ReviewDeck()
+        return deck
+
+    def _save(self, learner_id, lesson_key, deck):
+        # Elegir una palabra nueva no cambia el mazo: no hay nada que guardar
+        if deck.dirty:
+            self.backend.save(learner_id, lesson_key, deck)
+
+    def next_word(self, learner_id, lesson_key, dictionary):
+        """Siguiente palabra que debe practicar el alumno en la lección."""
+        with self._lock(learner_id, lesson_key):
+            deck = self._deck(learner_id, lesson_key)
+            word = deck.next_word(dictionary, self.clock(), self.rng)
+            self._save(learner_id, lesson_key, deck)
+            return word
+
+    def next_words(self, learner_id, lesson_key, dictionary, count):
+        """Hasta count palabras distintas, en el orden en que tocaría practicarlas."""
+        with self._lock(learner_id, lesson_key):
+            deck = self._deck(learner_id, lesson_key)
+            now = self.clock()
+            words = []
+            seen = set()
+            # Los intentos extra cubren las repeticiones en lecciones pequeñas
+            for _ in range(2 * count):
+                if len(words) == count:
+                    break
+                word = deck.next_word(dictionary, now, self.rng)
+                if word is None:
+                    break
+                if word not in seen:
+                    seen.add(word)
+                    words.append(word)
+            self._save(learner_id, lesson_key, deck)
+            return words
+
+    def review(self, learner_id, lesson_key, word, correct, help_used=False):
+        """Registra un intento: incorrecto, correcto con ayuda o correcto."""
+        grade = AGAIN if not correct else HARD if help_used else GOOD
+        with self._lock(learner_id, lesson_key):
+            deck = self._deck(learner_id, lesson_key)
+            deck.review(word, grade, self.clock())
+            self._save(learner_id, lesson_key, deck)
@@ -0,0 +1,15 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+# Los módulos de la aplicación están en la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.py abre la base de datos de progreso y arranca el vigilante de
+# lecciones al importarse; en las pruebas, una base temporal y sin vigilante
+_tmpdir = tempfile.mkdtemp(prefix='app_ingles_tests_')
+atexit.register(shutil.rmtree, _tmpdir, ignore_errors=True)
+os.environ['PROGRESS_DB'] = os.path.join(_tmpdir, 'progress.db')
+os.environ['LESSON_WATCH_INTERVAL'] = '0'
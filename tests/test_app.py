@@ -0,0 +1,133 @@
+"""Rutas de la aplicación con el cliente de pruebas de Flask."""
+import pytest
+
+import app as app_module
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+
+def test_quiz_batch_for_new_learner_uses_default_lesson(client):
+    response = client.post('/quiz/batch', json={'size': 3})
+    body = response.get_json()
+    assert body['status'] == 'success'
+    assert len(body['words']) == 3
+    batch = app_module._quiz_serializer().loads(body['token'])
+    assert batch['lesson'] == app_module.DEFAULT_LESSON_KEY
+
+def test_check_batch_records_results(client):
+    batch = client.post('/quiz/batch', json={'size': 2}).get_json()
+    word = batch['words'][0]['word']
+    response = client.post('/check_batch', json={
+        'token': batch['token'],
+        'results': [{'word': word, 'answer': 'xyzzy'}],
+        'next': 2,
+    })
+    body = response.get_json()
+    assert body['status'] == 'success'
+    assert body['recorded'] == 1
+    assert body['results'][0]['status'] in ('incorrect', 'almost')
+    assert len(body['next_batch']['words']) == 2
+
+@pytest.mark.parametrize('path', ['/quiz/batch', '/check_batch'])
+@pytest.mark.parametrize('payload', ['[1, 2]', '"texto"', '3'])
+def test_batch_routes_reject_non_object_bodies(client, path, payload):
+    response = client.post(path, data=payload, content_type='application/json')
+    assert response.status_code == 400
+    assert response.get_json()['status'] == 'error'
+
+@pytest.mark.parametrize('result', [{'word': ['x']}, {'word': {}}, {'word': 3}, 'palabra', None])
+def test_batch_routes_reject_malformed_results(client, result):
+    batch = client.post('/quiz/batch', json={'size': 1}).get_json()
+    response = client.post('/check_batch', json={'token': batch['token'], 'results': [result]})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['status'] == 'success'
+    assert body['results'] == [{'word': None, 'status': 'error'}]
+    assert body['recorded'] == 0
+
+def test_batch_size_overflow(client):
+    response = client.post('/quiz/batch', data='{"size": 1e400}',
+                           content_type='application/json')
+    body = response.get_json()
+    assert body['status'] == 'success'
+    assert len(body['words']) == app_module.app.config['QUIZ_BATCH_SIZE']
+
+    response = client.post('/check_batch', data='{"token": "%s", "results": [], "next": 1e400}'
+                           % body['token'], content_type='application/json')
+    assert response.get_json()['status'] == 'success'
+
+def test_check_batch_rejects_bad_token(client):
+    for token in (5, None, 'no-firmado'):
+        body = client.post('/check_batch', json={'token': token}).get_json()
+        assert body['status'] == 'error'
+
+def test_check_batch_reports_almost_with_fuzzy_matching(client, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'FUZZY_MATCHING', True)
+    monkeypatch.setitem(app_module.app.config, 'FUZZY_BUDGET_MS', 1000.0)
+    batch = client.post('/quiz/batch', json={'size': 1}).get_json()
+    assert batch['fuzzy'] is True
+    word = batch['words'][0]['word']
+    dictionary = app_module.get_dictionary(app_module.DEFAULT_LESSON_KEY)
+    answer = max(dictionary.answer_set(word), key=len)
+    typo = answer[:-1] + ('x' if answer[-1] != 'x' else 'y')
+    body = client.post('/check_batch', json={
+        'token': batch['token'],
+        'results': [{'word': word, 'answer': typo}],
+    }).get_json()
+    verdict = body['results'][0]
+    # La errata podría coincidir con otra respuesta válida de la palabra
+    assert verdict['status'] in ('almost', 'correct')
+    if verdict['status'] == 'almost':
+        assert verdict['closest'] in dictionary.answer_set(word)
+
+def test_deleted_lesson_falls_back_to_main_dictionary(client):
+    client.get('/')
+    with client.session_transaction() as session:
+        learner = session['learner_id']
+    state = app_module.progress.get_state(learner)
+    state['lesson_key'] = 'borrada.xml'
+    app_module.progress.save_state(learner, state)
+
+    body = client.post('/new_word').get_json()
+    assert body['status'] == 'success'
+    assert app_module.progress.get_state(learner)['lesson_key'] == app_module.DEFAULT_LESSON_KEY
+    assert client.get('/').status_code == 200
+
+def set_current_word(client, word):
+    """Pone word como palabra actual del alumno del cliente, en el diccionario principal."""
+    client.get('/')
+    with client.session_transaction() as session:
+        learner = session['learner_id']
+    state = app_module.progress.get_state(learner)
+    state.update(lesson_key=app_module.DEFAULT_LESSON_KEY, current_word=word, help_shown=False)
+    app_module.progress.save_state(learner, state)
+
+# 'a' tiene seis acepciones en el diccionario principal; 'at', 'by' y 'to'
+# son la tercera, cuarta y quinta
+@pytest.mark.parametrize('answer', ['at', 'By', ' to ', 'name of the letter A'])
+def test_check_accepts_any_sense_of_repeated_headword(client, answer):
+    set_current_word(client, 'a')
+    body = client.post('/check', data={'translation': answer}).get_json()
+    assert body['status'] == 'correct'
+
+def test_help_and_get_answer_list_every_sense(client):
+    set_current_word(client, 'a')
+    senses = app_module.get_dictionary(app_module.DEFAULT_LESSON_KEY)['a']
+    assert len(senses) > 3
+    expected = [{'translations': sense.original_translations, 'definition': sense.definition}
+                for sense in senses]
+
+    body = client.post('/help').get_json()
+    assert body['status'] == 'success'
+    assert body['senses'] == expected
+    for translation in ('at', 'by', 'to'):
+        assert translation in body['translations'].split('; ')
+
+    body = client.post('/get_answer', json={'word': 'a'}).get_json()
+    assert body['success'] is True
+    assert body['senses'] == expected
+    for translation in ('at', 'by', 'to'):
+        assert translation in body['translation'].split('; ')
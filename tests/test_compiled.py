@@ -0,0 +1,66 @@
+"""Ida y vuelta del formato binario precompilado (write_compiled / load_compiled)."""
+import os
+
+import pytest
+
+import dictionaries
+
+LESSON = os.path.join(dictionaries.basedir, 'lessons', '1.xml')
+
+
+@pytest.fixture
+def compiled_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(dictionaries, 'COMPILED_DIR', str(tmp_path))
+    return tmp_path
+
+@pytest.fixture(scope='module')
+def store():
+    return dictionaries._parse_lesson_xml(LESSON, '1.xml')
+
+
+def test_round_trip_equals_parsed_store(compiled_dir, store):
+    signature = dictionaries._file_signature(LESSON)
+    dictionaries.write_compiled('1.xml', store, signature)
+    mapped = dictionaries.load_compiled('1.xml', signature)
+    assert mapped is not None
+    assert list(mapped.words) == list(store.words)
+    for word in store.words:
+        assert mapped.senses(word) == store.senses(word)
+        assert mapped.translations(word) == store.translations(word)
+    # Nada del diccionario mapeado se copia al heap
+    assert dictionaries.memory_usage(mapped) == (0, os.path.getsize(dictionaries.compiled_path('1.xml')))
+    for word in store.words:
+        assert mapped.answer_set(word) == store.answer_set(word)
+        assert mapped.lookup_normalized(word) == store.lookup_normalized(word)
+        for answer in store.translations(word):
+            assert mapped.spanish_for(answer) == store.spanish_for(answer)
+
+def test_stale_signature_is_rejected(compiled_dir, store):
+    mtime_ns, size = dictionaries._file_signature(LESSON)
+    dictionaries.write_compiled('1.xml', store, (mtime_ns, size))
+    assert dictionaries.load_compiled('1.xml', (mtime_ns + 1, size)) is None
+
+def test_truncated_file_is_rejected(compiled_dir, store):
+    signature = dictionaries._file_signature(LESSON)
+    path = dictionaries.write_compiled('1.xml', store, signature)
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 3)
+    assert dictionaries.load_compiled('1.xml', signature) is None
+
+def test_missing_file(compiled_dir):
+    assert dictionaries.load_compiled('1.xml', (0, 0)) is None
+
+def test_rejected_mapping_is_closed(compiled_dir, store, monkeypatch):
+    signature = dictionaries._file_signature(LESSON)
+    dictionaries.write_compiled('1.xml', store, signature)
+    opened = []
+    real_mmap = dictionaries.mmap.mmap
+
+    def tracking_mmap(*args, **kwargs):
+        mm = real_mmap(*args, **kwargs)
+        opened.append(mm)
+        return mm
+
+    monkeypatch.setattr(dictionaries.mmap, 'mmap', tracking_mmap)
+    assert dictionaries.load_compiled('1.xml', (0, 0)) is None
+    assert len(opened) == 1 and opened[0].closed
@@ -0,0 +1,57 @@
+"""normalize_text y los índices del EntryStore (lookup_normalized / spanish_for)."""
+import pytest
+
+import dictionaries
+from dictionaries import _normalize_text_slow, build_store
+
+normalize = dictionaries.normalize_text.__wrapped__
+
+
+def entry(word, translations, definition=''):
+    return (word, translations, definition, dictionaries.parse_translations(translations))
+
+
+@pytest.mark.parametrize('block', range(0, 0x3000, 0x400), ids=hex)
+def test_fast_normalize_matches_slow(block):
+    for code_point in range(block, block + 0x400):
+        char = chr(code_point)
+        for text in (char, f' Ab{char}Ç ', f'{char}é', f'ñ{char}{char}x'):
+            assert normalize(text) == _normalize_text_slow(text), hex(code_point)
+
+def test_normalize_examples():
+    assert normalize('  Árbol ') == 'arbol'
+    assert normalize('PINGÜINO') == 'pinguino'
+    assert normalize('niño') == 'nino'
+    assert normalize('ñandú') == 'nandu'
+
+
+STORE = build_store([
+    entry('árbol', 'tree', '{m}'),
+    entry('arbol', 'mast', '{m}'),        # otra palabra, sin tilde
+    entry('niño', 'child, boy', '{m}'),
+    entry('café', 'coffee, café', '{m}'),
+    entry('cafetería', 'café', '{f}'),
+])
+
+def test_lookup_normalized_ignores_accents_and_case():
+    assert STORE.lookup_normalized('arbol') == ('arbol', 'árbol')
+    assert STORE.lookup_normalized(' ÁRBOL ') == ('arbol', 'árbol')
+    assert STORE.lookup_normalized('nino') == ('niño',)
+    assert STORE.lookup_normalized('NIÑO') == ('niño',)
+    assert STORE.lookup_normalized('nina') == ()
+
+def test_spanish_for_accented_headwords():
+    assert STORE.spanish_for('tree') == ('árbol',)
+    assert STORE.spanish_for('Child') == ('niño',)
+    # La respuesta también se compara sin tildes; el orden es el de STORE.words
+    assert STORE.spanish_for('cafe') == ('cafetería', 'café')
+    assert STORE.spanish_for('CAFÉ') == ('cafetería', 'café')
+    assert STORE.spanish_for('tea') == ()
+
+def test_main_dictionary_accented_headword():
+    dictionaries.refresh_lessons()
+    main = dictionaries.get_dictionary()
+    assert main.lookup_normalized('arbol') == ('árbol',)
+    assert main.lookup_normalized('Árbol') == ('árbol',)
+    assert 'árbol' in main.spanish_for('tree')
+    assert 'niño' in main.spanish_for('child')
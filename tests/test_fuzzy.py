@@ -0,0 +1,71 @@
+"""Búsqueda aproximada de respuestas (AnswerTrie / closest_answer)."""
+import random
+
+import pytest
+
+from fuzzy import AnswerTrie, closest_answer
+
+
+def osa_distance(a, b):
+    """Distancia OSA por fuerza bruta, como referencia."""
+    rows = [[i + j if not i or not j else 0 for j in range(len(b) + 1)] for i in range(len(a) + 1)]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            rows[i][j] = min(rows[i - 1][j] + 1, rows[i][j - 1] + 1,
+                             rows[i - 1][j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                rows[i][j] = min(rows[i][j], rows[i - 2][j - 2] + 1)
+    return rows[-1][-1]
+
+
+def closest(answers, text):
+    return closest_answer(frozenset(answers), text, budget_ms=None)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('receive', ('receive', 0)),
+    ('recieve', ('receive', 1)),     # dos letras intercambiadas cuentan como una
+    ('recive', ('receive', 1)),      # letra de menos
+    ('receeive', ('receive', 1)),    # letra de más
+    ('rexeive', ('receive', 1)),     # letra cambiada
+    ('rexeivr', None),               # dos errores con 7 letras: sólo se permite uno
+    ('to recieve', ('to receive', 1)),
+])
+def test_typos(text, expected):
+    assert closest(['receive', 'to receive', 'deceive'], text) == expected
+
+def test_short_input_threshold():
+    # len(text) // min_chars_per_edit: con menos de 4 letras no se tolera ningún error
+    assert closest(['cat'], 'cta') is None
+    assert closest(['cat'], 'cat') is None
+    assert closest(['hello'], 'helo') == ('hello', 1)
+    assert closest(['hello'], 'hxllx') is None
+    assert closest(['hello there'], 'hxllo thxre') == ('hello there', 2)
+    assert closest_answer(frozenset(['hello']), 'hxllx', min_chars_per_edit=2,
+                          budget_ms=None) == ('hello', 2)
+    # max_distance limita aunque el texto sea largo
+    assert closest(['hello there'], 'hxllo thxrx') is None
+
+def test_tie_break_is_alphabetical():
+    # 'house' y 'mouse' están a un error de 'louse'
+    assert closest(['mouse', 'house'], 'louse') == ('house', 1)
+    assert closest(['house', 'mouse'], 'louse') == ('house', 1)
+    # Un prefijo va antes que sus extensiones
+    assert closest(['cart', 'car'], 'carx') == ('car', 1)
+    # Menor distancia gana al orden alfabético
+    assert closest(['abcde', 'zbcdef'], 'zbcdefx') == ('zbcdef', 1)
+
+def test_no_answers():
+    assert closest([], 'anything') is None
+
+def test_matches_brute_force():
+    rng = random.Random(0)
+    for _ in range(2000):
+        answers = {''.join(rng.choice('abc') for _ in range(rng.randint(1, 7)))
+                   for _ in range(rng.randint(1, 6))}
+        text = ''.join(rng.choice('abc') for _ in range(rng.randint(0, 8)))
+        max_distance = rng.randint(0, 3)
+        candidates = sorted((osa_distance(answer, text), answer) for answer in answers)
+        distance, answer = candidates[0]
+        expected = (answer, distance) if distance <= max_distance else None
+        assert AnswerTrie(answers).closest(text, max_distance) == expected, (answers, text)
@@ -0,0 +1,70 @@
+"""Lecciones como vistas (LessonView) sobre el diccionario principal."""
+import os
+
+import pytest
+
+import dictionaries
+from dictionaries import build_store, build_view
+
+
+def entry(word, translations, definition=''):
+    return (word, translations, definition, dictionaries.parse_translations(translations))
+
+BASE = build_store([
+    entry('casa', 'house, home', '{f} building'),
+    entry('perro', 'dog', '{m}'),
+    entry('gato', 'cat', '{m}'),
+    entry('árbol', 'tree', '{m}'),
+])
+LESSON = build_store([
+    entry('casa', 'house, home', '{f} building'),   # igual que en BASE
+    entry('gato', 'tomcat', '{m}'),                  # acepciones distintas
+    entry('mesa', 'table', '{f}'),                   # sólo en la lección
+    entry('arbol', 'tree', '{m}'),                   # sin tilde: otra palabra
+])
+
+
+def assert_equivalent(view, store):
+    assert len(view) == len(store)
+    assert list(view.words) == list(store.words)
+    assert view.sense_count == store.sense_count
+    for word in store.words:
+        assert word in view
+        assert view[word] == store[word]
+        assert view.translations(word) == store.translations(word)
+        assert view.answer_set(word) == store.answer_set(word)
+        assert view.lookup_normalized(word) == store.lookup_normalized(word)
+        for answer in store.translations(word):
+            assert view.spanish_for(answer) == store.spanish_for(answer)
+    assert 'no-existe' not in view
+    assert view.answer_set('no-existe') == frozenset()
+    with pytest.raises(KeyError):
+        view['no-existe']
+
+
+def test_view_equals_standalone_store():
+    assert_equivalent(build_view(BASE, LESSON), LESSON)
+
+def test_shared_entries_point_to_base():
+    view = build_view(BASE, LESSON)
+    assert view.ids[view.index('casa')] == BASE.index('casa')
+    # Las demás están en la parte propia de la vista
+    assert list(view.extra.words) == ['arbol', 'gato', 'mesa']
+    assert 'perro' not in view
+    assert view.spanish_for('dog') == ()
+    assert view.spanish_for('cat') == ()
+    assert view.spanish_for('tomcat') == ('gato',)
+
+def test_view_words_sequence():
+    view = build_view(BASE, LESSON)
+    assert view.words[-1] == view.words[len(view) - 1]
+    with pytest.raises(IndexError):
+        view.words[len(view)]
+
+def test_real_lesson_view():
+    dictionaries.discover_lessons()
+    base = dictionaries.load_dictionary(dictionaries.MAIN_DICTIONARY)
+    path = os.path.join(dictionaries.basedir, 'lessons', '1.xml')
+    lesson = dictionaries._parse_lesson_xml(path, '1.xml')
+    view = build_view(base, lesson)
+    assert_equivalent(view, lesson)
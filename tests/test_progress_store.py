@@ -0,0 +1,65 @@
+"""Estado y progreso de los alumnos en SQLite."""
+import pytest
+
+from progress_store import ProgressStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ProgressStore(str(tmp_path / 'progress.db'), flush_interval=0.05)
+
+
+def test_state_round_trip(store):
+    assert store.get_state('a') == {'lesson_key': None, 'current_word': None, 'help_shown': False}
+    store.save_state('a', {'lesson_key': '1.xml', 'current_word': 'casa', 'help_shown': True})
+    assert store.get_state('a') == {'lesson_key': '1.xml', 'current_word': 'casa', 'help_shown': True}
+    store.save_state('a', {'lesson_key': '1.xml', 'current_word': 'perro', 'help_shown': False})
+    assert store.get_state('a')['current_word'] == 'perro'
+
+def test_lesson_stats(store):
+    store.record_attempt('a', '1.xml', 'casa', correct=False)
+    store.record_help('a', '1.xml', 'casa')
+    store.record_attempt('a', '1.xml', 'casa', correct=True, help_used=True)
+    store.record_attempt('a', 'dict_es_en.xml', 'perro', correct=True)
+    store.record_attempt('b', '1.xml', 'casa', correct=True)
+    store.flush()
+    stats = {row['lesson_key']: row for row in store.lesson_stats('a')}
+    assert stats['1.xml']['attempts'] == 2
+    assert stats['1.xml']['correct'] == 1
+    assert stats['1.xml']['helps'] == 1
+    assert stats['1.xml']['accuracy'] == 0.5
+    assert stats['dict_es_en.xml']['accuracy'] == 1.0
+    recent = store.recent_attempts('a', '1.xml')
+    assert [row['kind'] for row in recent] == ['check', 'help', 'check']
+    assert recent[0]['correct'] is True and recent[0]['help_used'] is True
+
+@pytest.mark.parametrize('learner_id, lesson_key, word', [
+    ('a', None, 'casa'),
+    (None, '1.xml', 'casa'),
+    ('a', '1.xml', ''),
+])
+def test_invalid_events_are_rejected(store, learner_id, lesson_key, word):
+    with pytest.raises(ValueError):
+        store.record_attempt(learner_id, lesson_key, word, correct=True)
+    with pytest.raises(ValueError):
+        store.record_help(learner_id, lesson_key, word)
+
+def test_bad_event_does_not_lose_its_batch(tmp_path, caplog):
+    # Con más espera, los tres eventos van en el mismo lote
+    store = ProgressStore(str(tmp_path / 'progress.db'), flush_interval=0.5)
+    store.record_attempt('a', '1.xml', 'casa', correct=True)
+    # Un evento que viola NOT NULL, encolado sin pasar por la validación
+    store._enqueue(('b', None, 'perro', 'check', 1, 0, 0.0))
+    store.record_attempt('c', '1.xml', 'gato', correct=False)
+    store.flush()
+    assert [row['word'] for row in store.recent_attempts('a')] == ['casa']
+    assert [row['word'] for row in store.recent_attempts('c')] == ['gato']
+    assert store.recent_attempts('b') == []
+    assert store.lesson_stats('c')[0]['attempts'] == 1
+    messages = [record.getMessage() for record in caplog.records]
+    assert any('uno a uno' in message for message in messages)
+    assert any('descartado' in message for message in messages)
+    # El hilo de escritura sigue vivo
+    store.record_attempt('a', '1.xml', 'perro', correct=True)
+    store.flush()
+    assert len(store.recent_attempts('a')) == 2
@@ -0,0 +1,151 @@
+"""Planificador de repaso espaciado y su almacenamiento en SQLite."""
+import random
+
+import pytest
+
+import scheduler as sched
+from progress_store import DeckBackend, ProgressStore
+
+
+class FakeDictionary:
+    def __init__(self, words):
+        self.words = sorted(words)
+
+    def __contains__(self, word):
+        return word in self.words
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000000.0
+
+    def __call__(self):
+        return self.now
+
+
+WORDS = FakeDictionary(f'palabra{i}' for i in range(50))
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+def make_scheduler(clock, backend=None):
+    return sched.Scheduler(backend, clock=clock, rng=random.Random(0))
+
+
+def test_review_intervals():
+    deck = sched.ReviewDeck()
+    deck.review('casa', sched.GOOD, 0)
+    assert deck.due[deck.slots['casa']] == sched.FIRST_INTERVAL
+    deck.review('casa', sched.GOOD, 0)
+    assert deck.due[deck.slots['casa']] == sched.SECOND_INTERVAL
+    deck.review('casa', sched.GOOD, 0)
+    assert deck.due[deck.slots['casa']] > sched.SECOND_INTERVAL
+    deck.review('casa', sched.AGAIN, 0)
+    assert deck.due[deck.slots['casa']] == sched.RELEARN_INTERVAL
+    assert deck.reps[deck.slots['casa']] == 0
+    assert deck.ease[deck.slots['casa']] >= sched.MIN_EASE
+
+def test_failed_word_comes_back_when_due(clock):
+    scheduler = make_scheduler(clock)
+    word = scheduler.next_word('a', 'l', WORDS)
+    scheduler.review('a', 'l', word, correct=False)
+    clock.now += sched.RELEARN_INTERVAL - 1
+    assert scheduler.next_word('a', 'l', WORDS) != word
+    clock.now += 2
+    assert scheduler.next_word('a', 'l', WORDS) == word
+
+def test_due_words_in_order(clock):
+    scheduler = make_scheduler(clock)
+    for word, correct in (('palabra1', True), ('palabra2', False)):
+        scheduler.review('a', 'l', word, correct)
+    clock.now += sched.FIRST_INTERVAL + 1
+    assert scheduler.next_words('a', 'l', WORDS, 2)[:2] == ['palabra2', 'palabra1']
+
+def test_next_words_are_distinct(clock):
+    words = make_scheduler(clock).next_words('a', 'l', WORDS, 20)
+    assert len(words) == 20 == len(set(words))
+
+def test_deck_tracks_changed_words():
+    deck = sched.ReviewDeck()
+    deck.review('casa', sched.GOOD, 0)
+    deck.review('perro', sched.AGAIN, 0)
+    changes = deck.take_changes()
+    assert [change[0] for change in changes] == ['casa', 'perro']
+    assert deck.take_changes() == []
+    copy = sched.ReviewDeck()
+    for change in changes:
+        copy.restore(*change)
+    assert not copy.dirty
+    for name in ('interval', 'ease', 'due', 'reps'):
+        assert getattr(copy, name) == getattr(deck, name)
+    assert copy._peek_due() == deck._peek_due()
+
+def test_new_word_is_not_saved(clock):
+    saved = []
+
+    class Backend(sched.MemoryBackend):
+        def save(self, learner_id, lesson_key, deck):
+            saved.append(deck.take_changes())
+            super().save(learner_id, lesson_key, deck)
+
+    scheduler = make_scheduler(clock, Backend())
+    word = scheduler.next_word('a', 'l', WORDS)
+    assert saved == []
+    scheduler.review('a', 'l', word, correct=False)
+    assert [[change[0] for change in changes] for changes in saved] == [[word]]
+    # Una palabra pendiente se aplaza (lease) y eso sí se guarda
+    clock.now += sched.RELEARN_INTERVAL + 1
+    assert scheduler.next_word('a', 'l', WORDS) == word
+    assert len(saved) == 2
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ProgressStore(str(tmp_path / 'progress.db'))
+
+def test_deck_backend_survives_restart(store, clock):
+    scheduler = make_scheduler(clock, DeckBackend(store))
+    scheduler.review('a', 'l', 'palabra3', correct=False)
+    # Otro proceso (o el mismo tras reiniciar) con la misma base de datos
+    restarted = make_scheduler(clock, DeckBackend(ProgressStore(store.path)))
+    clock.now += sched.RELEARN_INTERVAL + 1
+    assert restarted.next_word('a', 'l', WORDS) == 'palabra3'
+    assert DeckBackend(store).load('a', 'otra') is None
+
+def test_deck_backend_sees_other_workers_changes(store, clock):
+    first = make_scheduler(clock, DeckBackend(store))
+    second = make_scheduler(clock, DeckBackend(store))
+    first.review('a', 'l', 'palabra1', correct=True)
+    # second carga el mazo y lo guarda en su caché; después first lo cambia
+    assert len(second.backend.load('a', 'l')) == 1
+    first.review('a', 'l', 'palabra2', correct=False)
+    assert second.backend.load('a', 'l').words == ['palabra1', 'palabra2']
+
+def test_deck_backend_writes_only_changed_words(store, clock):
+    scheduler = make_scheduler(clock, DeckBackend(store))
+    for word in ('palabra1', 'palabra2', 'palabra3'):
+        scheduler.review('a', 'l', word, correct=True)
+    rows = dict(store._conn().execute('SELECT word, version FROM review_words'))
+    assert rows == {'palabra1': 1, 'palabra2': 2, 'palabra3': 3}
+
+def test_deck_backend_concurrent_write_reloads(store, clock):
+    first = DeckBackend(store)
+    second = DeckBackend(store)
+    first_deck = first.load('a', 'l') or sched.ReviewDeck()
+    second_deck = second.load('a', 'l') or sched.ReviewDeck()
+    first_deck.review('palabra1', sched.GOOD, clock.now)
+    second_deck.review('palabra2', sched.AGAIN, clock.now)
+    first.save('a', 'l', first_deck)
+    # second no ha visto palabra1: no puede quedarse con su mazo como si estuviera al día
+    second.save('a', 'l', second_deck)
+    assert sorted(second.load('a', 'l').words) == ['palabra1', 'palabra2']
+
+def test_deck_backend_keeps_removed_words_out(store, clock):
+    scheduler = make_scheduler(clock, DeckBackend(store))
+    scheduler.review('a', 'l', 'retirada', correct=False)
+    clock.now += sched.RELEARN_INTERVAL + 1
+    assert scheduler.next_word('a', 'l', WORDS) != 'retirada'
+    deck = DeckBackend(store).load('a', 'l')
+    assert deck.due[deck.slots['retirada']] == float('inf')
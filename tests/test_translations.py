@@ -0,0 +1,46 @@
+"""parse_translations y su versión por lotes, compile_translations."""
+import glob
+import os
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import dictionaries
+
+SOURCES = [os.path.join(dictionaries.basedir, dictionaries.MAIN_DICTIONARY)] + sorted(
+    glob.glob(os.path.join(dictionaries.basedir, 'lessons', '*.xml')))
+
+
+def translation_texts(path):
+    """Texto <d> de cada <w> del archivo (cadena vacía si falta)."""
+    texts = []
+    for _, elem in ET.iterparse(path):
+        if elem.tag == 'w':
+            d = elem.find('d')
+            texts.append(d.text if d is not None and d.text is not None else "")
+            elem.clear()
+    return texts
+
+
+@pytest.mark.parametrize('path', SOURCES, ids=os.path.basename)
+def test_compile_translations_matches_parse_translations(path):
+    texts = translation_texts(path)
+    assert texts
+    dictionaries.normalize_text.cache_clear()
+    batch = dictionaries.compile_translations(texts)
+    assert len(batch) == len(texts)
+    mismatches = [(text, list(compiled), dictionaries.parse_translations(text))
+                  for text, compiled in zip(texts, batch)
+                  if list(compiled) != dictionaries.parse_translations(text)]
+    assert mismatches[:5] == []
+
+@pytest.mark.parametrize('text, expected', [
+    ("house, home", ['house', 'home']),
+    ("to eat; to dine", ['to eat', 'eat', 'to dine', 'dine']),
+    ("{f} bank (of a river)", ['bank', 'bank (of a river)']),
+    ("Café [US], café", ['cafe']),
+    ("", []),
+])
+def test_parse_translations(text, expected):
+    assert dictionaries.parse_translations(text) == expected
+    assert list(dictionaries.compile_translations([text])[0]) == expected